@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -19,11 +20,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'service_desk.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'service_desk.middleware.RolesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -48,13 +51,60 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# SQLite под конкурентной записью (чат, заявки):
+# - WAL: читатели не блокируют писателя, а писатель — читателей;
+# - synchronous=NORMAL: в режиме WAL целостность сохраняется без fsync на каждый коммит;
+# - BEGIN IMMEDIATE: блокировка записи берётся в начале транзакции, поэтому
+#   писатель ждёт её до timeout, а не получает "database is locked" при
+#   повышении блокировки посреди транзакции;
+# - постоянные подключения: PRAGMA выполняются один раз на подключение.
+#   Только под WSGI. Под ASGI синхронный код идёт в пуле потоков,
+#   подключение остаётся в потоке, куда следующий запрос может не попасть,
+#   и такие подключения копятся, не закрываясь по возрасту. Поэтому при
+#   запуске под ASGI задайте в окружении SERVICE_DESK_CONN_MAX_AGE=0
+#   (подключение закрывается после запроса), см. README.
+CONN_MAX_AGE = int(os.environ.get('SERVICE_DESK_CONN_MAX_AGE', 600))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA temp_store=MEMORY;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA mmap_size=134217728;'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 10,
+        },
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Кеш общий для всех воркеров: на нём держатся сброс ролей, версия
+# каталога (ETag главной) и корзины ограничения частоты запросов.
+# Файловый кеш видят процессы одной машины (service_desk/cache.py);
+# при нескольких машинах — django.core.cache.backends.redis.RedisCache.
+CACHES = {
+    'default': {
+        'BACKEND': 'service_desk.cache.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Фрагменты HTML (service_desk/fragments.py): ключ включает версию
+    # инцидента, поэтому кеш процесса не отдаёт устаревшее, а его чистка
+    # при просмотре списков не вытесняет ключи из общего кеша.
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -84,8 +134,57 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# collectstatic: имена с хешем + предсжатые .gz/.br (service_desk/assets.py)
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "service_desk.assets.CompressedManifestStaticFilesStorage",
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/itsm/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Метрики запросов (/metrics/, формат Prometheus)
+# Запросы с числом SQL больше бюджета попадают в лог и отдельный счётчик
+METRICS_QUERY_BUDGET = 30
+# Каталог снимков для суммирования метрик нескольких воркеров (None — только свой процесс)
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+
+# Автоназначение новых инцидентов наименее загруженному технику
+AUTO_ASSIGN_INCIDENTS = True
+# Как часто (сек) куча нагрузки техников перечитывается из БД
+ASSIGNMENT_REBUILD_INTERVAL = 60
+
+# Повторы записи, если БД осталась заблокированной дольше timeout (service_desk/db.py)
+SQLITE_WRITE_RETRIES = 5
+SQLITE_RETRY_BASE_DELAY = 0.05
+
+# Ограничение частоты (service_desk/throttle.py): область → (запросов, за секунд)
+THROTTLE_ENABLED = True
+THROTTLE_RATES = {
+    'incident_submit': (5, 60),
+    'chat_send': (30, 10),
+}
+# Анонимные заявки отклоняются (429), пока сглаженное время записи выше порога (сек)
+THROTTLE_SHED_LATENCY = 0.25
+# IP клиента из X-Forwarded-For — только за доверенным обратным прокси
+THROTTLE_TRUST_X_FORWARDED_FOR = False
+
+# Уведомления техников (service_desk/outbox.py, manage.py deliver_notifications)
+NOTIFICATION_SENDER = 'service_desk.notifications.ConsoleSender'
+NOTIFICATION_SENDER_OPTIONS = {}
+# Например, в файл по строке JSON:
+# NOTIFICATION_SENDER = 'service_desk.notifications.FileSender'
+# NOTIFICATION_SENDER_OPTIONS = {'path': BASE_DIR / 'notifications.jsonl'}
+OUTBOX_MAX_ATTEMPTS = 8
+# Пауза перед первым повтором (сек), дальше удваивается
+OUTBOX_RETRY_BASE_DELAY = 5
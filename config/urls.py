@@ -1,8 +1,11 @@
 # config/urls.py
 from django.contrib import admin
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, include, re_path
 from django.contrib.auth import views as auth_views
 
+from service_desk import assets
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -15,3 +18,9 @@ urlpatterns = [
     # Основные URL приложения
     path('', include('service_desk.urls')),
 ]
+
+# Под DEBUG статику отдаёт runserver; без DEBUG — собранная collectstatic
+if not settings.DEBUG:
+    urlpatterns.insert(0, re_path(
+        r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'), assets.serve
+    ))
@@ -1,15 +1,98 @@
 # service_desk/admin.py
 from django.contrib import admin
-from .models import Service, Incident
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.utils.text import Truncator
+
+from .models import Service, Incident, Message
+from .pagination import EstimatedCountPaginator
+from .roles import TECH_GROUP
+from .search import filter_matching
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
     list_display = ("name", "price", "is_active")
     list_filter = ("is_active",)
     search_fields = ("name",)
+    # Постраничное автодополнение в IncidentAdmin требует порядка
+    ordering = ("name",)
+
+
+class TechnicianFilter(admin.SimpleListFilter):
+    """Исполнитель: только техники, а не все пользователи, и «не назначено»."""
+    title = "тех. специалисту"
+    parameter_name = "assigned_to"
+
+    def lookups(self, request, model_admin):
+        techs = (
+            User.objects.filter(groups__name=TECH_GROUP)
+            .order_by("username").values_list("id", "username")
+        )
+        return [("none", "Не назначено"), *((str(pk), name) for pk, name in techs)]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == "none":
+            return queryset.filter(assigned_to__isnull=True)
+        if value and value.isdigit():
+            return queryset.filter(assigned_to_id=int(value))
+        return queryset
+
+
+# Общее для больших таблиц: связанные строки одним JOIN, без полного COUNT(*)
+# и сортировка только по колонкам с индексом
+class LargeTableAdmin(admin.ModelAdmin):
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
 
 @admin.register(Incident)
-class IncidentAdmin(admin.ModelAdmin):
+class IncidentAdmin(LargeTableAdmin):
     list_display = ("id", "service", "status", "created_by", "assigned_to", "created_at")
-    list_filter = ("status", "service", "assigned_to")
+    list_select_related = ("service", "created_by", "assigned_to")
+    # Фильтры по колонкам индексов incident_*_idx
+    list_filter = ("status", "service", TechnicianFilter)
+    ordering = ("-created_at", "-id")
+    sortable_by = ("id", "created_at")
     search_fields = ("comment",)
+    autocomplete_fields = ("service", "created_by", "assigned_to")
+
+    def save_model(self, request, obj, form, change):
+        # Автор изменения для журнала (events.py)
+        obj._event_actor_id = request.user.pk
+        super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        obj._event_actor_id = request.user.pk
+        super().delete_model(request, obj)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Полнотекстовый индекс вместо LIKE-скана по всем комментариям
+        if not search_term.strip():
+            return queryset, False
+        return filter_matching(queryset, search_term), False
+
+
+@admin.register(Message)
+class MessageAdmin(LargeTableAdmin):
+    list_display = ("id", "sender", "receiver", "preview", "created_at")
+    list_select_related = ("sender", "receiver")
+    # Meta.ordering по created_at без индекса — сортируем по первичному ключу
+    ordering = ("-id",)
+    sortable_by = ("id",)
+    search_fields = ("sender__username",)
+    search_help_text = "Имя пользователя: его отправленные и полученные сообщения"
+    autocomplete_fields = ("sender", "receiver")
+    readonly_fields = ("created_at",)
+
+    @admin.display(description="Текст")
+    def preview(self, obj):
+        return Truncator(obj.text).chars(80)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Точное имя пользователя → индексы sender_id / receiver_id, без LIKE по тексту
+        username = search_term.strip()
+        if not username:
+            return queryset, False
+        user_ids = User.objects.filter(username=username).values("id")
+        return queryset.filter(Q(sender_id__in=user_ids) | Q(receiver_id__in=user_ids)), False
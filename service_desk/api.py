@@ -0,0 +1,87 @@
+# service_desk/api.py
+
+"""
+JSON API инцидентов (только чтение): /api/incidents/ и /api/incidents/<id>/.
+
+- ?fields=id,status — в SQL попадают только колонки выбранных полей
+  (и JOIN только ради них); по умолчанию — все поля API_FIELDS;
+- список — keyset-курсоры ?after=/?before= как у HTML-списка
+  (pagination.py) и те же фильтры (IncidentFilterForm);
+- ETag ресурса строится из id и version инцидента, ETag страницы — из
+  id и version её строк. В обоих учитывается набор полей, а если выбрано
+  имя услуги — ещё и версия каталога. На совпавший If-None-Match
+  отвечаем 304 без сериализации.
+
+Имена пользователей (created_by, assigned_to) в ETag не входят:
+переименование пользователя не меняет version инцидента.
+"""
+
+import hashlib
+
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+from .catalog import catalog_version
+
+# Имя поля в API → lookup для values()
+API_FIELDS = {
+    "id": "id",
+    "version": "version",
+    "status": "status",
+    "service_id": "service_id",
+    "service": "service__name",
+    "comment": "comment",
+    "created_at": "created_at",
+    "created_by": "created_by__username",
+    "assigned_to_id": "assigned_to_id",
+    "assigned_to": "assigned_to__username",
+}
+
+# id и created_at нужны курсору, version — ETag
+_ALWAYS_SELECTED = ("id", "created_at", "version")
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+
+
+def parse_fields(value):
+    """Список полей из ?fields=a,b; ValueError для неизвестных полей."""
+    if not value:
+        return list(API_FIELDS)
+
+    fields = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+    return fields or list(API_FIELDS)
+
+
+def select(queryset, fields):
+    lookups = dict.fromkeys([*_ALWAYS_SELECTED, *(API_FIELDS[name] for name in fields)])
+    return queryset.values(*lookups)
+
+
+def serialize(row, fields):
+    data = {name: row[API_FIELDS[name]] for name in fields}
+    if "created_at" in data:
+        data["created_at"] = timezone.localtime(data["created_at"]).isoformat()
+    return data
+
+
+def _variant(fields):
+    """Часть ETag, зависящая от представления, а не от строк."""
+    variant = ",".join(fields)
+    if "service" in fields:
+        variant += f"@{catalog_version().timestamp()}"
+    return hashlib.md5(variant.encode(), usedforsecurity=False).hexdigest()[:8]
+
+
+def resource_etag(row, fields):
+    return quote_etag(f"{row['id']}-{row['version']}-{_variant(fields)}")
+
+
+def page_etag(rows, fields):
+    digest = hashlib.md5(usedforsecurity=False)
+    for row in rows:
+        digest.update(f"{row['id']}:{row['version']};".encode())
+    return quote_etag(f"{digest.hexdigest()}-{_variant(fields)}")
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class ServiceDeskConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'service_desk'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
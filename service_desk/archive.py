@@ -0,0 +1,89 @@
+# service_desk/archive.py
+
+"""
+Холодный архив сообщений чата.
+
+Сообщения старше срока хранения переносятся пачками в сжатые сегменты
+MessageArchiveSegment (по сегменту на пару в пачке) и удаляются из
+Message — горячая таблица и её индексы остаются небольшими. Так как id
+растёт вместе со временем, архив пары всегда старше её горячей части,
+и история дочитывает архив только при прокрутке за горячее окно.
+"""
+
+import json
+import zlib
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .conversations import ordered_pair
+from .models import Message, MessageArchiveSegment
+
+# Совместим с Message по полям, которые читает сериализация чата
+ArchivedMessage = namedtuple("ArchivedMessage", "id sender_id created_at text")
+
+
+def _pack(messages):
+    rows = [[m.id, m.sender_id, m.created_at.isoformat(), m.text] for m in messages]
+    return zlib.compress(json.dumps(rows, ensure_ascii=False).encode(), 6)
+
+
+def unpack(segment):
+    rows = json.loads(zlib.decompress(bytes(segment.data)))
+    return [
+        ArchivedMessage(id, sender_id, parse_datetime(created_at), text)
+        for id, sender_id, created_at, text in rows
+    ]
+
+
+def archive_batch(cutoff, batch_size):
+    """Переносит до batch_size старейших сообщений до cutoff. Возвращает их число."""
+    with transaction.atomic():
+        messages = list(
+            Message.objects.filter(created_at__lt=cutoff)
+            .order_by("id")
+            .only("id", "sender_id", "receiver_id", "created_at", "text")[:batch_size]
+        )
+        if not messages:
+            return 0
+
+        by_pair = defaultdict(list)
+        for m in messages:
+            by_pair[ordered_pair(m.sender_id, m.receiver_id)].append(m)
+
+        MessageArchiveSegment.objects.bulk_create([
+            MessageArchiveSegment(
+                user_low_id=low,
+                user_high_id=high,
+                first_message_id=chunk[0].id,
+                last_message_id=chunk[-1].id,
+                first_created_at=chunk[0].created_at,
+                last_created_at=chunk[-1].created_at,
+                message_count=len(chunk),
+                data=_pack(chunk),
+            )
+            for (low, high), chunk in by_pair.items()
+        ])
+        Message.objects.filter(id__in=[m.id for m in messages]).delete()
+    return len(messages)
+
+
+def read_archive(user_id, other_id, before_id=None, limit=50):
+    """
+    До limit архивных сообщений пары с id < before_id, от новых к старым.
+    Сегменты распаковываются по одному, пока не наберётся limit.
+    """
+    low, high = ordered_pair(user_id, other_id)
+    segments = MessageArchiveSegment.objects.filter(user_low_id=low, user_high_id=high)
+    if before_id is not None:
+        segments = segments.filter(first_message_id__lt=before_id)
+
+    result = []
+    for segment in segments.order_by("-last_message_id").iterator(chunk_size=10):
+        for m in reversed(unpack(segment)):
+            if before_id is None or m.id < before_id:
+                result.append(m)
+                if len(result) == limit:
+                    return result
+    return result
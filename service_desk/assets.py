@@ -0,0 +1,150 @@
+# service_desk/assets.py
+
+"""
+Статика: отпечатки в именах, предсжатие и раздача.
+
+    python manage.py collectstatic
+
+CompressedManifestStaticFilesStorage (STORAGES["staticfiles"]) при
+collectstatic копирует файлы в STATIC_ROOT с хешем содержимого в имени
+(style.css → style.3f2a…c1.css) и записывает манифест; {% static %}
+берёт имена из него. Текстовые файлы сразу сжимаются: рядом кладутся
+.gz и, если установлен пакет brotli, .br — сжатие не тратит CPU на
+каждый запрос.
+
+serve() раздаёт STATIC_ROOT, когда DEBUG выключен: выбирает сжатый
+вариант по Accept-Encoding, а имена с хешем отдаёт с
+Cache-Control: immutable на год — при изменении файла меняется и имя.
+Под DEBUG статику по-прежнему отдаёт runserver из STATICFILES_DIRS.
+"""
+
+import gzip
+import mimetypes
+import os
+import posixpath
+from functools import lru_cache
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # необязательная зависимость: без неё только gzip
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".map", ".html", ".xml")
+# Файлы меньше не сжимаем: выигрыш меньше одного TCP-пакета
+MIN_COMPRESS_SIZE = 512
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Имена без хеша могут смениться в любой момент
+MUTABLE_MAX_AGE = 60
+
+# Расширение файла → Content-Encoding, в порядке предпочтения
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _compressors():
+    yield ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield ".br", lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        # И исходные имена, и с хешем: по исходным статику запрашивают сторонние ссылки
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                for suffix in self._compress(name):
+                    yield name, name + suffix, True
+
+    def _compress(self, name):
+        with self.open(name) as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compress in _compressors():
+            compressed = compress(data)
+            # Сжатие, которое почти ничего не дало, не стоит лишнего заголовка
+            if len(compressed) >= len(data) * 0.95:
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+            yield suffix
+
+
+@lru_cache(maxsize=1)
+def _immutable_names():
+    """Имена с хешем из манифеста (читается один раз — collectstatic требует перезапуска)."""
+    return frozenset(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+@require_safe
+def serve(request, path):
+    path = posixpath.normpath(path).lstrip("/")
+    try:
+        fullpath = safe_join(staticfiles_storage.location, path)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    # Сжатый вариант отдаётся только вместо исходного файла по Accept-Encoding:
+    # напрямую style.css.gz ушёл бы как text/css без Content-Encoding
+    for _, suffix in ENCODINGS:
+        if path.endswith(suffix) and os.path.isfile(fullpath[:-len(suffix)]):
+            raise Http404
+
+    stat = os.stat(fullpath)
+    if not was_modified_since(request.headers.get("If-Modified-Since"), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    accepted = _accepted_encodings(request)
+    content_encoding = None
+    for coding, suffix in ENCODINGS:
+        if coding in accepted and os.path.isfile(fullpath + suffix):
+            content_encoding = coding
+            fullpath += suffix
+            break
+
+    content_type, _ = mimetypes.guess_type(path)
+    response = FileResponse(
+        open(fullpath, "rb"), content_type=content_type or "application/octet-stream"
+    )
+    # FileResponse подставил бы имя сжатого файла (style.css.gz)
+    del response.headers["Content-Disposition"]
+    response.headers["Last-Modified"] = http_date(stat.st_mtime)
+    response.headers["Vary"] = "Accept-Encoding"
+    if content_encoding:
+        response.headers["Content-Encoding"] = content_encoding
+    if path in _immutable_names():
+        response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response.headers["Cache-Control"] = f"public, max-age={MUTABLE_MAX_AGE}"
+    return response
@@ -0,0 +1,173 @@
+# service_desk/assignment.py
+
+"""
+Автоназначение инцидентов наименее загруженному технику.
+
+Нагрузка — число открытых инцидентов техника. Движок держит её в куче
+(min-heap) в памяти процесса: выбор техника — O(log n). Куча строится
+из счётчиков IncidentStat (O(число счётчиков)), а затем обновляется
+инкрементально: при выборе техника и после коммита изменений инцидентов
+(signals.py). Раз в ASSIGNMENT_REBUILD_INTERVAL секунд, а также при
+изменении состава группы Tech куча перестраивается из БД — это
+исправляет расхождения между воркерами и после откатов транзакций.
+"""
+
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Sum
+
+from . import events, stats
+from .models import Incident, IncidentStat
+from .roles import TECH_GROUP
+
+OPEN_STATUSES = ("new", "in_progress")
+
+
+def _open_loads(tech_ids):
+    loads = dict.fromkeys(tech_ids, 0)
+    rows = (
+        IncidentStat.objects.filter(technician_id__in=tech_ids, status__in=OPEN_STATUSES)
+        .values("technician_id")
+        .annotate(n=Sum("count"))
+    )
+    for row in rows:
+        loads[row["technician_id"]] = row["n"]
+    return loads
+
+
+class AssignmentEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loads = None
+        self._heap = []
+        self._built_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._loads = None
+
+    def _ensure_built(self):
+        interval = getattr(settings, "ASSIGNMENT_REBUILD_INTERVAL", 60)
+        if self._loads is not None and time.monotonic() - self._built_at < interval:
+            return
+
+        tech_ids = list(
+            User.objects.filter(groups__name=TECH_GROUP, is_active=True)
+            .values_list("id", flat=True)
+        )
+        self._loads = _open_loads(tech_ids)
+        self._heap = [(load, tech_id) for tech_id, load in self._loads.items()]
+        heapq.heapify(self._heap)
+        self._built_at = time.monotonic()
+
+    def _push(self, tech_id):
+        heapq.heappush(self._heap, (self._loads[tech_id], tech_id))
+        # Устаревшие записи кучи отбрасываются лениво; не даём им копиться
+        if len(self._heap) > 4 * len(self._loads) + 16:
+            self._heap = [(load, tid) for tid, load in self._loads.items()]
+            heapq.heapify(self._heap)
+
+    def pick(self):
+        """Техник с наименьшей нагрузкой (или None); его нагрузка сразу +1."""
+        with self._lock:
+            self._ensure_built()
+            while self._heap:
+                load, tech_id = heapq.heappop(self._heap)
+                if self._loads.get(tech_id) != load:
+                    continue  # запись устарела
+                self._loads[tech_id] = load + 1
+                self._push(tech_id)
+                return tech_id
+            return None
+
+    def adjust(self, tech_id, delta):
+        with self._lock:
+            if self._loads is None or tech_id not in self._loads:
+                return
+            self._loads[tech_id] = max(self._loads[tech_id] + delta, 0)
+            self._push(tech_id)
+
+    def incident_moved(self, old, new, count=1):
+        """count инцидентов перешли между корзинами статистики (после коммита)."""
+        for bucket, delta in ((old, -count), (new, +count)):
+            if bucket is None:
+                continue
+            _, tech_id, status = bucket
+            if tech_id != IncidentStat.UNASSIGNED and status in OPEN_STATUSES:
+                self.adjust(tech_id, delta)
+
+    def loads(self):
+        with self._lock:
+            self._ensure_built()
+            return dict(self._loads)
+
+
+engine = AssignmentEngine()
+
+
+def auto_assign_enabled():
+    return getattr(settings, "AUTO_ASSIGN_INCIDENTS", False)
+
+
+def assign_new_incident(incident):
+    """Назначает новый (ещё не сохранённый) инцидент наименее загруженному технику."""
+    tech_id = engine.pick()
+    if tech_id is not None:
+        incident.assigned_to_id = tech_id
+        # Нагрузку уже учёл pick() — сигнал после сохранения её не дублирует
+        incident._auto_assigned = True
+    return tech_id
+
+
+def assign_backlog(batch_size=5000):
+    """
+    Распределяет все открытые неназначенные инциденты за один проход:
+    по одной выборке и одному UPDATE на техника для каждой пачки.
+    Возвращает {tech_id: число назначенных}.
+    """
+    local = AssignmentEngine()
+    assigned = Counter()
+    last_id = 0
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Incident.objects.select_for_update()
+                .filter(assigned_to__isnull=True, status__in=OPEN_STATUSES, id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "version", "service_id", "status")[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            by_tech = defaultdict(list)
+            deltas = Counter()
+            changes = []
+            for incident_id, version, service_id, status in rows:
+                tech_id = local.pick()
+                if tech_id is None:
+                    return assigned
+                by_tech[tech_id].append(incident_id)
+                deltas[stats.bucket_of(service_id, None, status)] -= 1
+                deltas[stats.bucket_of(service_id, tech_id, status)] += 1
+                changes.append((incident_id, version + 1, (status, None), (status, tech_id)))
+
+            for tech_id, ids in by_tech.items():
+                Incident.objects.filter(id__in=ids).update(
+                    assigned_to_id=tech_id, version=F("version") + 1
+                )
+                assigned[tech_id] += len(ids)
+
+            # update() обходит сигналы — счётчики панели и журнал ведём сами
+            stats.apply_deltas(deltas)
+            events.record_changes(changes)
+
+    transaction.on_commit(engine.invalidate)
+    return assigned
@@ -0,0 +1,143 @@
+# service_desk/bulk.py
+
+"""
+Массовое изменение инцидентов: статус или исполнитель.
+
+Каждая пачка строк меняется одним UPDATE, который пишет только
+изменяемое поле и version; строки, где значение уже нужное, не
+трогаются вовсе.
+
+Оптимистическая блокировка: для выбранных инцидентов клиент присылает
+версии, которые видел. Если строку с тех пор изменил кто-то другой
+(версия выросла) или удалил, она не обновляется и попадает в conflicts.
+
+update() обходит сигналы, поэтому счётчики статистики, нагрузку
+автоназначения и журнал изменений (events.py) ведём здесь — по строкам,
+заблокированным в той же транзакции.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from . import events, stats
+from .assignment import engine as assignment_engine
+from .models import Incident
+
+# Поля, которые можно менять массово
+BULK_FIELDS = ("status", "assigned_to_id")
+
+BULK_BATCH_SIZE = 2000
+
+_ROW_FIELDS = ("id", "version", "service_id", "assigned_to_id", "status")
+
+
+class BulkResult:
+    def __init__(self, updated=0, unchanged=0, conflicts=()):
+        self.updated = updated
+        self.unchanged = unchanged
+        self.conflicts = sorted(conflicts)
+
+
+def _same_value(field, value):
+    if value is None:
+        return Q(**{f"{field}__isnull": True})
+    return Q(**{field: value})
+
+
+def _moved(old, new, count):
+    return lambda: assignment_engine.incident_moved(old, new, count)
+
+
+def _apply(rows, field, value, actor_id=None):
+    """Один UPDATE по заблокированным строкам rows + счётчики корзин и журнал."""
+    if not rows:
+        return
+
+    Incident.objects.filter(id__in=[row[0] for row in rows]).update(
+        **{field: value}, version=F("version") + 1
+    )
+
+    moves = Counter()
+    changes = []
+    for incident_id, version, service_id, assigned_to_id, status in rows:
+        new_status, new_assigned_to_id = status, assigned_to_id
+        if field == "status":
+            new_status = value
+        else:
+            new_assigned_to_id = value
+        old = stats.bucket_of(service_id, assigned_to_id, status)
+        new = stats.bucket_of(service_id, new_assigned_to_id, new_status)
+        moves[old, new] += 1
+        changes.append((
+            incident_id, version + 1,
+            (status, assigned_to_id), (new_status, new_assigned_to_id),
+        ))
+    events.record_changes(changes, actor_id)
+
+    deltas = Counter()
+    for (old, new), count in moves.items():
+        deltas[old] -= count
+        deltas[new] += count
+        transaction.on_commit(_moved(old, new, count))
+    stats.apply_deltas(deltas)
+
+
+def update_selected(expected_versions, field, value, actor=None):
+    """
+    Меняет field на value у инцидентов {id: ожидаемая версия}.
+    Инциденты с другой версией не меняются и возвращаются в conflicts.
+    actor — пользователь для журнала изменений.
+    """
+    if field not in BULK_FIELDS:
+        raise ValueError(f"Поле {field} нельзя менять массово")
+
+    position = _ROW_FIELDS.index(field)
+    with transaction.atomic():
+        rows = list(
+            Incident.objects.select_for_update()
+            .filter(id__in=list(expected_versions))
+            .values_list(*_ROW_FIELDS)
+        )
+        conflicts = set(expected_versions) - {row[0] for row in rows}
+        changed = []
+        for row in rows:
+            if row[1] != expected_versions[row[0]]:
+                conflicts.add(row[0])
+            elif row[position] != value:
+                changed.append(row)
+        _apply(changed, field, value, actor and actor.pk)
+
+    return BulkResult(
+        updated=len(changed),
+        unchanged=len(expected_versions) - len(changed) - len(conflicts),
+        conflicts=conflicts,
+    )
+
+
+def update_matching(queryset, field, value, actor=None, batch_size=BULK_BATCH_SIZE):
+    """
+    Меняет field на value у всех инцидентов queryset (фильтр списка).
+    Пачки по batch_size строк в порядке id, каждая — своя транзакция.
+    """
+    if field not in BULK_FIELDS:
+        raise ValueError(f"Поле {field} нельзя менять массово")
+
+    queryset = queryset.exclude(_same_value(field, value)).order_by("id")
+    updated = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                queryset.select_for_update()
+                .filter(id__gt=last_id)
+                .values_list(*_ROW_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            _apply(rows, field, value, actor and actor.pk)
+        updated += len(rows)
+
+    return BulkResult(updated=updated)
@@ -0,0 +1,36 @@
+# service_desk/cache.py
+
+"""
+Общий для воркеров кеш (CACHES["default"] в settings).
+
+Роли (roles.py), версия каталога (catalog.py) и корзины ограничения
+частоты (throttle.py) должны быть одними для всех процессов: сброс в
+одном воркере обязан быть виден остальным. LocMemCache по умолчанию
+у каждого процесса свой, поэтому по умолчанию — файловый кеш в
+каталоге проекта: его видят все воркеры одной машины, новых
+зависимостей не нужно. Для нескольких машин — RedisCache/Memcached.
+
+Стандартный FileBasedCache на каждой записи перечитывает каталог,
+чтобы решить, пора ли чистить: при тысячах ключей (корзины по IP)
+запись стоит миллисекунды. Здесь чистка идёт не чаще раза в
+cull_interval секунд; просроченные файлы и так удаляются при чтении.
+"""
+
+import time
+
+from django.core.cache.backends import filebased
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    cull_interval = 10
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._last_cull = 0.0
+
+    def _cull(self):
+        now = time.monotonic()
+        if now - self._last_cull < self.cull_interval:
+            return
+        self._last_cull = now
+        super()._cull()
@@ -0,0 +1,71 @@
+# service_desk/catalog.py
+
+"""
+Кеш публичного каталога услуг.
+
+Отрендеренный каталог и список услуг для формы заявки хранятся в кеше
+под текущей версией каталога. Версия — время последнего изменения
+услуг; её меняют сигналы Service post_save/post_delete (signals.py),
+и она же служит ETag/Last-Modified главной страницы.
+
+Версия лежит в общем для воркеров кеше (cache.py), иначе сброс в одном
+процессе не увидят остальные. Если ключ версии вытеснен, создаётся
+новая — это лишь лишний промах кеша, а не устаревший каталог.
+"""
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Service
+
+CATALOG_VERSION_KEY = "catalog:version"
+CATALOG_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def catalog_version():
+    """Время последнего изменения каталога (datetime)."""
+    return cache.get_or_set(CATALOG_VERSION_KEY, timezone.now, None)
+
+
+def invalidate_catalog():
+    cache.set(CATALOG_VERSION_KEY, timezone.now(), None)
+
+
+def _versioned_key(name):
+    return f"catalog:{name}:{catalog_version().timestamp()}"
+
+
+def catalog_html():
+    """HTML карточек активных услуг для главной страницы."""
+    key = _versioned_key("html")
+    html = cache.get(key)
+    if html is None:
+        services = Service.objects.filter(is_active=True)
+        html = render_to_string("includes/catalog_cards.html", {"services": services})
+        cache.set(key, html, CATALOG_CACHE_TIMEOUT)
+    return html
+
+
+def service_choices():
+    """Пары (id, название) всех услуг для выпадающего списка формы."""
+    key = _versioned_key("choices")
+    choices = cache.get(key)
+    if choices is None:
+        choices = [(s.pk, str(s)) for s in Service.objects.all()]
+        cache.set(key, choices, CATALOG_CACHE_TIMEOUT)
+    return choices
+
+
+# --- Условные запросы: только для анонимов, у них страница общая ---
+
+def catalog_etag(request, *args, **kwargs):
+    if request.user.is_authenticated:
+        return None
+    return f'"catalog-{catalog_version().timestamp()}"'
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    if request.user.is_authenticated:
+        return None
+    return catalog_version()
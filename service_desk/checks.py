@@ -0,0 +1,31 @@
+# service_desk/checks.py
+
+"""
+Проверки настроек (python manage.py check).
+
+Версия каталога — это ETag и Last-Modified главной страницы; она и
+кеш ролей сбрасываются записью в кеш. Если кеш свой у каждого
+процесса (LocMemCache, DummyCache), остальные воркеры продолжают
+отдавать старый каталог и 304 на устаревший ETag.
+"""
+
+from django.conf import settings
+from django.core import checks
+
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if backend not in PROCESS_LOCAL_CACHES or settings.DEBUG:
+        return []
+    return [checks.Warning(
+        f"Кеш по умолчанию ({backend}) свой у каждого процесса.",
+        hint="Версия каталога, роли и ограничение частоты запросов требуют "
+             "общего кеша: service_desk.cache.FileBasedCache или RedisCache.",
+        id="service_desk.W001",
+    )]
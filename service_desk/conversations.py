@@ -0,0 +1,164 @@
+# service_desk/conversations.py
+
+"""
+Поддержка сводок переписки (Conversation) для списка чатов:
+последнее сообщение, непрочитанные и курсор прочтения каждой стороны.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Q
+
+from .db import retry_on_lock
+from .models import Conversation, Message
+
+PREVIEW_LENGTH = 200
+
+
+def ordered_pair(user_id, other_id):
+    """(меньший id, больший id) — так пара хранится в сводках и архиве."""
+    return (user_id, other_id) if user_id <= other_id else (other_id, user_id)
+
+
+def _side(user_id, other_id):
+    """Суффикс полей участника user_id в сводке пары."""
+    return "low" if user_id <= other_id else "high"
+
+
+def record_message(message):
+    """Обновляет сводку пары после нового сообщения (в транзакции отправки)."""
+    sender_id, receiver_id = message.sender_id, message.receiver_id
+    low, high = ordered_pair(sender_id, receiver_id)
+
+    fields = {
+        "last_message_id": message.id,
+        "last_message_at": message.created_at,
+        "last_message_text": message.text[:PREVIEW_LENGTH],
+        "last_sender_id": sender_id,
+    }
+    unread = {}
+    if sender_id != receiver_id:
+        unread = {f"unread_{_side(receiver_id, sender_id)}": 1}
+
+    pair = Conversation.objects.filter(user_low_id=low, user_high_id=high)
+    updated = pair.update(**fields, **{
+        name: F(name) + value for name, value in unread.items()
+    })
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            Conversation.objects.create(user_low_id=low, user_high_id=high, **fields, **unread)
+    except IntegrityError:
+        # Сводку параллельно создал другой запрос
+        pair.update(**fields, **{name: F(name) + value for name, value in unread.items()})
+
+
+@retry_on_lock
+def send_message(sender, receiver, text):
+    """Сохраняет сообщение и сводку пары одной транзакцией."""
+    with transaction.atomic():
+        message = Message.objects.create(sender=sender, receiver=receiver, text=text)
+        record_message(message)
+    return message
+
+
+@retry_on_lock
+def mark_read(user_id, other_id, last_id=None):
+    """
+    Сдвигает курсор прочтения user_id до last_id (по умолчанию — до
+    последнего сообщения) и пересчитывает непрочитанные.
+    """
+    low, high = ordered_pair(user_id, other_id)
+    side = _side(user_id, other_id)
+
+    with transaction.atomic():
+        conversation = (
+            Conversation.objects.select_for_update()
+            .filter(user_low_id=low, user_high_id=high)
+            .first()
+        )
+        if conversation is None:
+            return 0
+
+        cursor = conversation.last_message_id
+        if last_id is not None:
+            # Курсор из запроса не может уйти дальше последнего сообщения,
+            # иначе будущие сообщения окажутся прочитанными заранее
+            cursor = min(last_id, conversation.last_message_id)
+        cursor = max(getattr(conversation, f"read_{side}_id"), cursor)
+
+        # Непрочитанные — входящие после курсора (индекс message_pair_idx)
+        unread = Message.objects.filter(
+            sender_id=other_id, receiver_id=user_id, id__gt=cursor
+        ).count() if user_id != other_id else 0
+
+        Conversation.objects.filter(pk=conversation.pk).update(**{
+            f"read_{side}_id": cursor,
+            f"unread_{side}": unread,
+        })
+    return unread
+
+
+def rebuild():
+    """
+    Полный пересчёт сводок по таблице сообщений (после bulk_create, который
+    обходит record_message). История считается прочитанной обеими сторонами.
+    """
+    last_ids = {}
+    rows = (
+        Message.objects.order_by()
+        .values("sender_id", "receiver_id")
+        .annotate(last=Max("id"))
+    )
+    for row in rows:
+        pair = ordered_pair(row["sender_id"], row["receiver_id"])
+        last_ids[pair] = max(last_ids.get(pair, 0), row["last"])
+
+    last_messages = Message.objects.in_bulk(list(last_ids.values()))
+    with transaction.atomic():
+        Conversation.objects.all().delete()
+        Conversation.objects.bulk_create([
+            Conversation(
+                user_low_id=low,
+                user_high_id=high,
+                last_message_id=message_id,
+                last_message_at=last_messages[message_id].created_at,
+                last_message_text=last_messages[message_id].text[:PREVIEW_LENGTH],
+                last_sender_id=last_messages[message_id].sender_id,
+                read_low_id=message_id,
+                read_high_id=message_id,
+            )
+            for (low, high), message_id in last_ids.items()
+        ], batch_size=1000)
+
+
+class ConversationEntry:
+    """Сводка глазами одного участника — для шаблона."""
+
+    def __init__(self, conversation, user_id):
+        mine = "low" if conversation.user_low_id == user_id else "high"
+        self.conversation = conversation
+        self.other = conversation.user_high if mine == "low" else conversation.user_low
+        self.unread = getattr(conversation, f"unread_{mine}")
+        self.last_message_id = conversation.last_message_id
+        self.last_message_at = conversation.last_message_at
+        self.last_message_text = conversation.last_message_text
+        self.last_is_mine = conversation.last_sender_id == user_id
+
+
+def recent_conversations(user_id, limit, before=None):
+    """Переписки пользователя от свежих к старым; before — курсор last_message_id."""
+    conversations = Conversation.objects.filter(
+        Q(user_low_id=user_id) | Q(user_high_id=user_id)
+    )
+    if before is not None:
+        conversations = conversations.filter(last_message_id__lt=before)
+
+    rows = list(
+        conversations.select_related("user_low", "user_high")
+        .order_by("-last_message_id")[:limit + 1]
+    )
+    entries = [ConversationEntry(c, user_id) for c in rows[:limit]]
+    next_cursor = entries[-1].last_message_id if len(rows) > limit else None
+    return entries, next_cursor
@@ -0,0 +1,72 @@
+# service_desk/db.py
+
+"""
+Запись в SQLite под конкуренцией.
+
+В settings.DATABASES транзакции открываются как BEGIN IMMEDIATE, поэтому
+писатель ждёт блокировку до timeout в самом начале транзакции. Если
+ожидание всё же истекло ("database is locked"), retry_on_lock повторяет
+операцию целиком с экспоненциальной задержкой и случайным разбросом.
+
+Повторять можно только законченную единицу работы: внутри внешней
+транзакции ошибка пробрасывается сразу — откатить и повторить её должен
+тот, кто её открыл.
+"""
+
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+logger = logging.getLogger(__name__)
+
+LOCK_ERRORS = ("database is locked", "database table is locked", "database is busy")
+
+MAX_RETRY_DELAY = 2.0
+
+
+def is_lock_error(exc):
+    message = str(exc).lower()
+    return any(text in message for text in LOCK_ERRORS)
+
+
+def retry_on_lock(func=None, *, attempts=None, base_delay=None, using=DEFAULT_DB_ALIAS):
+    """
+    Декоратор: повторяет func при блокировке БД.
+
+    attempts и base_delay по умолчанию берутся из SQLITE_WRITE_RETRIES
+    и SQLITE_RETRY_BASE_DELAY. Можно и обернуть вызов на месте:
+    retry_on_lock(incident.save)().
+    """
+    if func is None:
+        return functools.partial(
+            retry_on_lock, attempts=attempts, base_delay=base_delay, using=using
+        )
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        total = attempts or getattr(settings, "SQLITE_WRITE_RETRIES", 1)
+        delay = base_delay or getattr(settings, "SQLITE_RETRY_BASE_DELAY", 0.05)
+
+        for attempt in range(1, total + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if (
+                    attempt == total
+                    or not is_lock_error(exc)
+                    or connections[using].in_atomic_block
+                ):
+                    raise
+                pause = min(delay * 2 ** (attempt - 1), MAX_RETRY_DELAY)
+                pause *= random.uniform(0.5, 1.5)
+                logger.warning(
+                    "БД заблокирована (%s), попытка %d/%d, повтор через %.3f с",
+                    func.__qualname__, attempt, total, pause,
+                )
+                time.sleep(pause)
+
+    return wrapper
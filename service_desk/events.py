@@ -0,0 +1,138 @@
+# service_desk/events.py
+
+"""
+Журнал изменений инцидентов (IncidentEvent) и лента изменений по курсору.
+
+События пишутся в той же транзакции, что и изменение инцидента:
+- save()/delete() — сигналами (signals.py);
+- массовые изменения (bulk.py, assign_backlog) и импорт, которые
+  обходят сигналы, — явно, пачкой через bulk_create.
+
+Для каждого события здесь же ставятся уведомления техникам (outbox.py).
+
+Клиенты (список инцидентов, внешние синхронизаторы) запоминают id
+последнего события и запрашивают только то, что появилось после него.
+Пропусков нет, пока id видны в порядке коммита: SQLite с BEGIN IMMEDIATE
+сериализует запись, на СУБД с параллельной записью курсор нужно вести
+с запасом.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models import Max
+from django.utils import timezone
+
+from . import outbox
+from .models import IncidentEvent
+
+EVENT_BATCH_SIZE = 2000
+
+FEED_PAGE_SIZE = 200
+FEED_MAX_PAGE_SIZE = 1000
+
+
+def record_created(incidents, actor_id=None, notify=True):
+    """
+    События создания для сохранённых инцидентов (actor — по умолчанию автор).
+    notify=False — без уведомлений (импорт, тестовые данные).
+    """
+    events = IncidentEvent.objects.bulk_create([
+        IncidentEvent(
+            incident_id=incident.pk,
+            kind=IncidentEvent.CREATED,
+            status=incident.status,
+            assigned_to_id=incident.assigned_to_id,
+            version=incident.version,
+            actor_id=actor_id or incident.created_by_id,
+        )
+        for incident in incidents
+    ], batch_size=EVENT_BATCH_SIZE)
+    if notify:
+        outbox.enqueue(events)
+
+
+def record_changes(changes, actor_id=None):
+    """
+    События изменения: changes — кортежи
+    (id, версия после, (прежний статус, прежний исполнитель), (статус, исполнитель)).
+    """
+    events = IncidentEvent.objects.bulk_create([
+        IncidentEvent(
+            incident_id=incident_id,
+            kind=IncidentEvent.UPDATED,
+            status=status,
+            assigned_to_id=assigned_to_id,
+            previous_status=previous_status,
+            previous_assigned_to_id=previous_assigned_to_id,
+            version=version,
+            actor_id=actor_id,
+        )
+        for incident_id, version, (previous_status, previous_assigned_to_id),
+            (status, assigned_to_id) in changes
+    ], batch_size=EVENT_BATCH_SIZE)
+    outbox.enqueue(events)
+
+
+def record_deleted(incident, actor_id=None):
+    IncidentEvent.objects.create(
+        incident_id=incident.pk,
+        kind=IncidentEvent.DELETED,
+        status=incident.status,
+        assigned_to_id=None,
+        previous_status=incident.status,
+        previous_assigned_to_id=incident.assigned_to_id,
+        version=incident.version,
+        actor_id=actor_id,
+    )
+
+
+def latest_cursor():
+    # MAX(id) SQLite берёт из конца первичного ключа одним поиском
+    return IncidentEvent.objects.aggregate(cursor=Max("id"))["cursor"] or 0
+
+
+def changes_since(cursor, limit=FEED_PAGE_SIZE):
+    """События после курсора (id) по возрастанию и признак, что есть ещё."""
+    events = list(
+        IncidentEvent.objects.filter(id__gt=cursor)
+        .select_related("actor")
+        .order_by("id")[:limit + 1]
+    )
+    return with_usernames(events[:limit]), len(events) > limit
+
+
+def history(incident_id, limit=50):
+    """Последние события инцидента, от новых к старым."""
+    events = (
+        IncidentEvent.objects.filter(incident_id=incident_id)
+        .select_related("actor")
+        .order_by("-id")[:limit]
+    )
+    return with_usernames(list(events))
+
+
+def with_usernames(events):
+    """Проставляет assigned_to_name / previous_assigned_to_name одним запросом."""
+    ids = {e.assigned_to_id for e in events} | {e.previous_assigned_to_id for e in events}
+    ids.discard(None)
+    names = dict(User.objects.filter(id__in=ids).values_list("id", "username")) if ids else {}
+    for event in events:
+        event.assigned_to_name = names.get(event.assigned_to_id)
+        event.previous_assigned_to_name = names.get(event.previous_assigned_to_id)
+    return events
+
+
+def serialize(event):
+    return {
+        "id": event.id,
+        "incident_id": event.incident_id,
+        "kind": event.kind,
+        "version": event.version,
+        "status": event.status,
+        "status_display": event.get_status_display(),
+        "assigned_to_id": event.assigned_to_id,
+        "assigned_to": event.assigned_to_name,
+        "previous_status": event.previous_status or None,
+        "previous_assigned_to_id": event.previous_assigned_to_id,
+        "actor": event.actor.username if event.actor else None,
+        "created_at": timezone.localtime(event.created_at).isoformat(),
+    }
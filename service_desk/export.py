@@ -0,0 +1,68 @@
+# service_desk/export.py
+
+"""
+Потоковая выгрузка инцидентов в CSV / JSONL.
+
+Строки читаются из БД итератором порциями по EXPORT_CHUNK_SIZE и сразу
+сериализуются, поэтому память не зависит от числа инцидентов.
+"""
+
+import csv
+import json
+
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FORMATS = ("csv", "jsonl")
+
+EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("service", "service__name"),
+    ("created_by", "created_by__username"),
+    ("assigned_to", "assigned_to__username"),
+    ("status", "status"),
+    ("created_at", "created_at"),
+    ("comment", "comment"),
+]
+
+
+def export_rows(queryset):
+    """Кортежи значений EXPORT_COLUMNS в порядке id."""
+    return (
+        queryset.order_by("id")
+        .values_list(*[lookup for _, lookup in EXPORT_COLUMNS])
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: write() возвращает строку, а не пишет её."""
+
+    def write(self, value):
+        return value
+
+
+def _as_dict(row):
+    data = dict(zip([name for name, _ in EXPORT_COLUMNS], row))
+    data["created_at"] = timezone.localtime(data["created_at"]).isoformat()
+    return data
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        data = _as_dict(row)
+        yield writer.writerow([
+            "" if value is None else value for value in data.values()
+        ])
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(_as_dict(row), ensure_ascii=False) + "\n"
+
+
+def iter_export(queryset, fmt):
+    rows = export_rows(queryset)
+    return iter_csv(rows) if fmt == "csv" else iter_jsonl(rows)
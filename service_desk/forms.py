@@ -1,5 +1,9 @@
 from django import forms
+from django.contrib.auth.models import User
+
+from .catalog import service_choices
 from .models import Service, Incident
+from .roles import TECH_GROUP
 
 
 class PublicIncidentForm(forms.ModelForm):
@@ -10,8 +14,130 @@ class PublicIncidentForm(forms.ModelForm):
             'comment': forms.Textarea(attrs={'rows': 4}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Список услуг из кеша каталога; queryset остаётся для валидации
+        field = self.fields['service']
+        field.choices = [("", field.empty_label)] + service_choices()
+
 
 class ServiceForm(forms.ModelForm):
     class Meta:
         model = Service
         fields = ["name", "description", "price", "is_active"]
+
+
+class IncidentFilterForm(forms.Form):
+    """Фильтры списка инцидентов (GET-параметры)."""
+
+    UNASSIGNED = "none"
+
+    q = forms.CharField(
+        label="Поиск",
+        required=False,
+        widget=forms.TextInput(attrs={"placeholder": "Поиск по комментарию и услуге"}),
+    )
+    status = forms.ChoiceField(
+        label="Статус",
+        choices=[("", "Все статусы")] + Incident.STATUS_CHOICES,
+        required=False,
+    )
+    service = forms.ModelChoiceField(
+        label="Услуга",
+        queryset=Service.objects.order_by("name"),
+        required=False,
+        empty_label="Все услуги",
+    )
+    assigned_to = forms.ChoiceField(label="Назначено", required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        techs = User.objects.filter(groups__name=TECH_GROUP).order_by("username")
+        self.fields["assigned_to"].choices = [
+            ("", "Все"),
+            (self.UNASSIGNED, "Не назначено"),
+        ] + [(str(tech.id), tech.username) for tech in techs]
+
+    @property
+    def search_text(self):
+        self.is_valid()
+        return self.cleaned_data.get("q", "").strip()
+
+    def filter(self, queryset):
+        """
+        Применяет валидные фильтры; невалидные значения игнорируются.
+        Поиск q сюда не входит — он ранжирует результаты (search.py).
+        """
+        # cleaned_data содержит только поля, прошедшие валидацию
+        self.is_valid()
+        data = self.cleaned_data
+
+        if data.get("status"):
+            queryset = queryset.filter(status=data["status"])
+        if data.get("service"):
+            queryset = queryset.filter(service=data["service"])
+        if data.get("assigned_to") == self.UNASSIGNED:
+            queryset = queryset.filter(assigned_to__isnull=True)
+        elif data.get("assigned_to"):
+            queryset = queryset.filter(assigned_to_id=data["assigned_to"])
+        return queryset
+
+
+class BulkActionForm(forms.Form):
+    """
+    Массовое действие из списка инцидентов.
+
+    scope=selected — отмеченные инциденты: ids и версии version_<id>,
+    с которыми их видел пользователь; scope=filter — все по фильтру списка.
+    """
+
+    MAX_SELECTED = 1000
+
+    action = forms.ChoiceField(choices=[("status", "Статус"), ("assign", "Назначить")])
+    scope = forms.ChoiceField(
+        choices=[("selected", "Отмеченные"), ("filter", "Все по фильтру")],
+        initial="selected",
+    )
+    status = forms.ChoiceField(label="Статус", choices=Incident.STATUS_CHOICES, required=False)
+    assigned_to = forms.ChoiceField(label="Техник", required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        techs = User.objects.filter(groups__name=TECH_GROUP).order_by("username")
+        self.fields["assigned_to"].choices = [
+            (IncidentFilterForm.UNASSIGNED, "Не назначено"),
+        ] + [(str(tech.id), tech.username) for tech in techs]
+
+    def clean(self):
+        data = super().clean()
+        action = data.get("action")
+
+        if action == "status":
+            if not data.get("status"):
+                raise forms.ValidationError("Выберите статус.")
+            data["change"] = ("status", data["status"])
+        elif action == "assign":
+            tech = data.get("assigned_to")
+            if not tech:
+                raise forms.ValidationError("Выберите техника.")
+            data["change"] = (
+                "assigned_to_id",
+                None if tech == IncidentFilterForm.UNASSIGNED else int(tech),
+            )
+
+        if data.get("scope") == "selected":
+            data["expected_versions"] = self._expected_versions()
+        return data
+
+    def _expected_versions(self):
+        ids = self.data.getlist("ids")
+        if not ids:
+            raise forms.ValidationError("Не отмечено ни одного инцидента.")
+        if len(ids) > self.MAX_SELECTED:
+            raise forms.ValidationError(
+                f"Можно отметить не больше {self.MAX_SELECTED} инцидентов."
+            )
+        try:
+            return {int(pk): int(self.data[f"version_{pk}"]) for pk in ids}
+        except (KeyError, ValueError):
+            raise forms.ValidationError("Некорректный список инцидентов.")
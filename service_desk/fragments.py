@@ -0,0 +1,95 @@
+# service_desk/fragments.py
+
+"""
+Кеш отрендеренных фрагментов страниц инцидентов.
+
+- строка списка инцидентов и карточка инцидента — ключ из id и version
+  (растёт при каждом изменении инцидента, в том числе массовом) плюс
+  названия, которые берутся из связанных таблиц: услуги и исполнителя;
+- выпадающий список техников — ключ из самого списка (id, имя) и
+  выбранного техника.
+
+Всё, что показывает фрагмент, входит в ключ, поэтому инвалидация не нужна
+и устаревшего HTML не бывает: изменилось — другой ключ, старые записи
+вытесняются по таймауту. Строки списка читаются из кеша одним get_many.
+Строки результатов поиска не кешируются: в них подсветка под запрос.
+
+Фрагменты лежат в отдельном кеше CACHES["fragments"]: их много, и их
+вытеснение не должно задевать роли, версию каталога и корзины
+ограничения частоты в кеше по умолчанию.
+"""
+
+import hashlib
+
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+ROW_TEMPLATE = "itsm/includes/incident_row.html"
+CARD_TEMPLATE = "itsm/includes/incident_card.html"
+TECH_SELECT_TEMPLATE = "itsm/includes/tech_select.html"
+
+
+def _cache():
+    return caches["fragments"]
+
+
+def _key(kind, *parts):
+    # Язык и часовой пояс влияют на вывод дат и названий статусов
+    raw = ":".join(map(str, (*parts, get_language(), timezone.get_current_timezone_name())))
+    return f"fragment:{kind}:{hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()}"
+
+
+def _incident_key(kind, incident):
+    """Ключ по версии; service и assigned_to должны быть загружены (select_related)."""
+    assignee = incident.assigned_to.username if incident.assigned_to_id else ""
+    return _key(kind, incident.pk, incident.version, incident.service.name, assignee)
+
+
+def incident_rows(incidents, search_text=None):
+    """HTML строк <tr> таблицы инцидентов в порядке incidents."""
+    template = get_template(ROW_TEMPLATE)
+    if search_text:
+        return [
+            template.render({"incident": incident, "search_text": search_text})
+            for incident in incidents
+        ]
+
+    keys = [_incident_key("row", incident) for incident in incidents]
+    cached = _cache().get_many(keys)
+    missing = {}
+    rows = []
+    for key, incident in zip(keys, incidents):
+        html = cached.get(key)
+        if html is None:
+            html = missing[key] = template.render({"incident": incident})
+        rows.append(mark_safe(html))
+    if missing:
+        _cache().set_many(missing, FRAGMENT_CACHE_TIMEOUT)
+    return rows
+
+
+def incident_card(incident):
+    key = _incident_key("card", incident)
+    html = _cache().get(key)
+    if html is None:
+        html = get_template(CARD_TEMPLATE).render({"incident": incident})
+        _cache().set(key, html, FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe(html)
+
+
+def tech_select(techs, selected_id=None):
+    """<select name="assigned_to"> из пар (id, имя) техников."""
+    techs = list(techs)
+    key = _key("techs", selected_id, techs)
+    html = _cache().get(key)
+    if html is None:
+        html = get_template(TECH_SELECT_TEMPLATE).render(
+            {"techs": techs, "selected_id": selected_id}
+        )
+        _cache().set(key, html, FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe(html)
@@ -0,0 +1,73 @@
+# service_desk/management/commands/archive_messages.py
+
+"""
+Перенос старых сообщений чата в сжатый архив:
+    python manage.py archive_messages --days 180 --benchmark
+
+Работает пачками по --batch-size, каждая пачка — отдельная транзакция,
+поэтому команду можно прервать и запустить снова.
+"""
+
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from service_desk.archive import archive_batch
+from service_desk.models import Conversation, Message
+
+
+def _hot_path_ms(pairs, repeat=5):
+    """Медиана времени запроса последней страницы переписки (горячий путь чата)."""
+    timings = []
+    for low, high in pairs:
+        query = Message.objects.filter(
+            Q(sender_id=low, receiver_id=high) | Q(sender_id=high, receiver_id=low)
+        ).order_by("-id")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(query[:51])
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings) if timings else 0.0
+
+
+class Command(BaseCommand):
+    help = "Архивирует сообщения чата старше срока хранения"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=180, help="Срок хранения в горячей таблице")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--benchmark", action="store_true",
+                            help="Замерить запрос истории чата до и после архивации")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        pairs = list(
+            Conversation.objects.order_by("-last_message_id")
+            .values_list("user_low_id", "user_high_id")[:50]
+        )
+
+        if options["benchmark"]:
+            before_ms = _hot_path_ms(pairs)
+            before_rows = Message.objects.count()
+
+        total = 0
+        started = time.monotonic()
+        while True:
+            archived = archive_batch(cutoff, options["batch_size"])
+            if not archived:
+                break
+            total += archived
+            rate = total / max(time.monotonic() - started, 1e-9)
+            self.stdout.write(f"  архивировано {total} ({rate:.0f} сообщений/с)")
+
+        self.stdout.write(self.style.SUCCESS(f"Готово: архивировано {total} сообщений"))
+
+        if options["benchmark"]:
+            self.stdout.write(
+                f"Горячая таблица: {before_rows} → {Message.objects.count()} строк; "
+                f"запрос истории: медиана {before_ms:.2f} → {_hot_path_ms(pairs):.2f} мс"
+            )
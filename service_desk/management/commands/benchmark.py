@@ -0,0 +1,284 @@
+# service_desk/management/commands/benchmark.py
+
+"""
+Бенчмарк всех URL приложения (service_desk/urls.py).
+
+    python manage.py seed_data --incidents 100000
+    python manage.py benchmark --requests 50 -o bench.json
+    python manage.py benchmark --baseline bench.json      # сравнение с прошлым отчётом
+    python manage.py benchmark --server http://127.0.0.1:8000 --threads 16
+
+По умолчанию запросы идут через тестовый клиент Django в этом процессе:
+для каждого URL считаются p50/p95/p99 задержки, число SQL-запросов и
+пропускная способность. С --server те же GET-запросы параллельно
+отправляются в запущенный сервер из --threads потоков.
+
+С --baseline команда завершается ошибкой, если p95 вырос больше чем на
+--threshold процентов или выросло число SQL-запросов.
+"""
+
+import json
+import math
+import statistics
+import threading
+import time
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from service_desk import urls as app_urls
+from service_desk.models import Incident, Message, Service
+
+
+def percentile(values, p):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(timings, elapsed):
+    return {
+        "requests": len(timings),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "throughput_rps": round(len(timings) / elapsed, 1) if elapsed else None,
+    }
+
+
+class Command(BaseCommand):
+    help = "Замер задержек, SQL-запросов и пропускной способности всех URL приложения"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=30, help="Запросов на URL")
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--user", help="Пользователь (по умолчанию — первый суперпользователь)")
+        parser.add_argument("-o", "--output", help="Файл JSON-отчёта")
+        parser.add_argument("--baseline", help="Прошлый отчёт для сравнения")
+        parser.add_argument("--threshold", type=float, default=20.0,
+                            help="Допустимый рост p95, %%")
+        parser.add_argument("--skip", nargs="*", default=[], help="Имена пропускаемых целей")
+        parser.add_argument("--server", help="URL запущенного сервера для параллельной нагрузки")
+        parser.add_argument("--threads", type=int, default=8)
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["user"])
+        client = Client()
+        client.force_login(user)
+
+        targets = [t for t in self.targets(user) if t["name"] not in options["skip"]]
+        report = {
+            "meta": {
+                "created_at": timezone.now().isoformat(),
+                "user": user.username,
+                "incidents": Incident.objects.count(),
+                "messages": Message.objects.count(),
+                "services": Service.objects.count(),
+                "users": User.objects.count(),
+            },
+            "results": {},
+        }
+
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            # Повторы одного маршрута одним пользователем: лимит мерил бы 429
+            THROTTLE_ENABLED=False,
+        ):
+            for target in targets:
+                result = self.run_client(client, target, options)
+                report["results"][target["name"]] = result
+                self.print_result(target["name"], result)
+
+        if options["server"]:
+            session = client.cookies[settings.SESSION_COOKIE_NAME].value
+            report["server"] = {}
+            for target in targets:
+                if target["method"] != "GET":
+                    continue
+                result = self.run_server(options["server"], session, target, options)
+                report["server"][target["name"]] = result
+                self.print_result(f"[server] {target['name']}", result)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Отчёт записан в {options['output']}")
+
+        if options["baseline"]:
+            self.compare(report, options["baseline"], options["threshold"])
+
+    # ------------------------------------------------------------------
+
+    def get_user(self, username):
+        users = User.objects.all()
+        user = (
+            users.filter(username=username).first() if username
+            else users.filter(is_superuser=True).order_by("id").first()
+        )
+        if user is None:
+            raise CommandError("Нет пользователя для бенчмарка (запустите seed_data).")
+        return user
+
+    def targets(self, user):
+        """Цели: каждый маршрут service_desk/urls.py с подставленными параметрами."""
+        incident = Incident.objects.order_by("-id").first()
+        service = Service.objects.order_by("id").first()
+        other = (
+            Message.objects.order_by("-id").values_list("receiver_id", flat=True).first()
+            or User.objects.exclude(id=user.id).values_list("id", flat=True).first()
+        )
+        sample = {
+            "incident_detail": {"pk": incident and incident.pk},
+            "api_incident": {"pk": incident and incident.pk},
+            "service_edit": {"pk": service and service.pk},
+            "service_delete": {"pk": service and service.pk},
+            "chat_room": {"user_id": other},
+            "api_get_messages": {"user_id": other},
+            "api_wait_messages": {"user_id": other},
+            "api_mark_read": {"user_id": other},
+        }
+        # Маршруты, которые замеряются POST-запросом, и их данные
+        post_data = {
+            "api_send_message": {"receiver_id": other, "text": "benchmark"},
+            "api_mark_read": {},
+        }
+        variants = {
+            "incidents_list": ["", "?status=new", "?assigned_to=none", "?q=принтер"],
+            "incidents_export": ["?status=cancelled&assigned_to=none"],
+            "api_get_messages": ["", "?since_id=0"],
+            "api_wait_messages": ["?since_id=0"],
+        }
+
+        result = []
+        for pattern in app_urls.urlpatterns:
+            name = pattern.name
+            kwargs = sample.get(name, {})
+            if any(value is None for value in kwargs.values()):
+                self.stderr.write(f"Пропуск {name}: нет данных для параметров")
+                continue
+
+            try:
+                url = reverse(f"{app_urls.app_name}:{name}", kwargs=kwargs)
+            except NoReverseMatch:
+                # Новый маршрут с параметрами, которых нет в sample
+                self.stderr.write(f"Пропуск {name}: не заданы параметры маршрута")
+                continue
+
+            if name in post_data:
+                result.append({
+                    "name": name, "method": "POST", "url": url, "data": post_data[name],
+                })
+                continue
+
+            for query in variants.get(name, [""]):
+                result.append({
+                    "name": f"{name} {query}".strip(), "method": "GET", "url": url + query,
+                })
+        return result
+
+    def run_client(self, client, target, options):
+        def call():
+            if target["method"] == "POST":
+                response = client.post(target["url"], target["data"])
+            else:
+                response = client.get(target["url"])
+            if response.streaming:
+                b"".join(response.streaming_content)
+            return response
+
+        for _ in range(options["warmup"]):
+            call()
+
+        timings, queries = [], []
+        started = time.perf_counter()
+        for _ in range(options["requests"]):
+            with CaptureQueriesContext(connection) as captured:
+                t0 = time.perf_counter()
+                response = call()
+                timings.append((time.perf_counter() - t0) * 1000)
+            queries.append(len(captured))
+        elapsed = time.perf_counter() - started
+
+        result = summarize(timings, elapsed)
+        result.update({
+            "method": target["method"],
+            "url": target["url"],
+            "status": response.status_code,
+            "queries": max(queries),
+        })
+        return result
+
+    def run_server(self, base_url, session, target, options):
+        url = base_url.rstrip("/") + target["url"]
+        headers = {"Cookie": f"{settings.SESSION_COOKIE_NAME}={session}"}
+        timings, errors = [], []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(options["requests"]):
+                t0 = time.perf_counter()
+                try:
+                    with urlopen(Request(url, headers=headers), timeout=60) as response:
+                        response.read()
+                except OSError as exc:
+                    with lock:
+                        errors.append(str(exc))
+                    continue
+                with lock:
+                    timings.append((time.perf_counter() - t0) * 1000)
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        result = summarize(timings, elapsed) if timings else {"requests": 0}
+        result.update({"url": target["url"], "threads": options["threads"], "errors": len(errors)})
+        return result
+
+    def print_result(self, name, result):
+        if not result.get("requests"):
+            self.stdout.write(self.style.ERROR(f"{name}: нет успешных запросов"))
+            return
+        self.stdout.write(
+            f"{name:45} p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  "
+            f"p99 {result['p99_ms']:8.2f} мс  "
+            f"{result['throughput_rps']:8.1f} rps  "
+            f"SQL {result.get('queries', '-')}"
+        )
+
+    def compare(self, report, baseline_path, threshold):
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+        regressions = []
+        self.stdout.write(f"\nСравнение с {baseline_path}:")
+        for name, result in report["results"].items():
+            old = baseline.get(name)
+            if not old:
+                continue
+            change = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0
+            line = (
+                f"{name:45} p95 {old['p95_ms']:8.2f} → {result['p95_ms']:8.2f} мс "
+                f"({change:+.0f}%)  SQL {old['queries']} → {result['queries']}"
+            )
+            if change > threshold or result["queries"] > old["queries"]:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f"Регрессии: {', '.join(regressions)}")
@@ -0,0 +1,247 @@
+# service_desk/management/commands/benchmark_chat.py
+
+"""
+API чата под ASGI: асинхронные представления против прежних синхронных.
+
+    python manage.py seed_data --messages 100000
+    python manage.py benchmark_chat --clients 500 --requests 10
+
+Запросы идут прямо в ASGI-приложение (как из config/asgi.py) в этом
+процессе из --clients одновременных корутин: опрос новых сообщений,
+загрузка истории и доля --send-ratio отправок. Синхронный вариант — прежние
+api_get_messages/api_send_message на синхронном ORM; их маршруты
+(urlpatterns ниже) подключаются только на время замера.
+
+Для каждого варианта: запросы в секунду, p50/p95/p99 и пик числа
+потоков процесса: ASGIHandler выполняет синхронный код каждого запроса
+в отдельном потоке.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import include, path, reverse
+
+from service_desk import views
+from service_desk.conversations import send_message
+from service_desk.models import Message
+from service_desk.pubsub import broker
+
+from .benchmark import summarize
+
+# ------------------ прежние синхронные представления -----------------
+
+
+@login_required
+def sync_get_messages(request, user_id):
+    other = get_object_or_404(User, id=user_id)
+    return JsonResponse(views._messages_page(
+        request.user, other,
+        since_id=views._int_param(request, "since_id"),
+        before_id=views._int_param(request, "before_id"),
+    ))
+
+
+@login_required
+def sync_send_message(request):
+    text = (request.POST.get("text") or "").strip()
+    receiver = User.objects.filter(id=request.POST.get("receiver_id")).first()
+    if not text or not receiver:
+        return JsonResponse({"status": "error"}, status=400)
+    message = send_message(request.user, receiver, text)
+    broker.publish(request.user.id, receiver.id)
+    return JsonResponse({"status": "ok", "id": message.id})
+
+
+urlpatterns = [
+    path("benchmark/sync/messages/<int:user_id>/", sync_get_messages, name="sync_get_messages"),
+    path("benchmark/sync/send/", sync_send_message, name="sync_send_message"),
+    path("", include(settings.ROOT_URLCONF)),
+]
+
+
+# Любые 32 допустимых символа — cookie и заголовок CSRF совпадают
+CSRF_TOKEN = "benchmarkbenchmarkbenchmarkbench"
+
+
+async def asgi_request(app, method, path, cookie, query=None, data=None):
+    """Один HTTP-запрос в ASGI-приложение; возвращает код ответа."""
+    body = urlencode(data).encode() if data else b""
+    headers = [
+        (b"host", b"testserver"),
+        (b"cookie", f"{cookie}; {settings.CSRF_COOKIE_NAME}={CSRF_TOKEN}".encode()),
+        (b"x-csrftoken", CSRF_TOKEN.encode()),
+    ]
+    if data:
+        headers.append((b"content-type", b"application/x-www-form-urlencoded"))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(query or {}).encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    pending = [{"type": "http.request", "body": body, "more_body": False}]
+    status = None
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        # Клиент не отключается; ожидание отменит сам обработчик
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+class ThreadSampler:
+    """Пик числа потоков процесса, опрос раз в interval секунд."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self.baseline = threading.active_count()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class Command(BaseCommand):
+    help = "Сравнение асинхронного и синхронного API чата под нагрузкой ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=200, help="Одновременных клиентов")
+        parser.add_argument("--requests", type=int, default=10, help="Запросов на клиента")
+        parser.add_argument("--send-ratio", type=float, default=0.1, help="Доля отправок")
+        parser.add_argument("--user", help="Пользователь (по умолчанию — самый активный отправитель)")
+        parser.add_argument("-o", "--output", help="Файл JSON-отчёта")
+
+    def handle(self, *args, **options):
+        user, other = self.get_pair(options["user"])
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        report = {}
+
+        with override_settings(
+            ROOT_URLCONF=__name__,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            # Все клиенты — один пользователь: лимит отправок мерил бы 429
+            THROTTLE_ENABLED=False,
+        ):
+            variants = {
+                "sync": (
+                    reverse("sync_get_messages", kwargs={"user_id": other.id}),
+                    reverse("sync_send_message"),
+                ),
+                "async": (
+                    reverse("service_desk:api_get_messages", kwargs={"user_id": other.id}),
+                    reverse("service_desk:api_send_message"),
+                ),
+            }
+            for name, urls in variants.items():
+                report[name] = asyncio.run(self.run_variant(cookie, other, *urls, options))
+                self.print_result(name, report[name])
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Отчёт записан в {options['output']}")
+
+    def get_pair(self, username):
+        users = User.objects.all()
+        if username:
+            user = users.filter(username=username).first()
+        else:
+            sender_id = (
+                Message.objects.order_by("-id").values_list("sender_id", flat=True).first()
+            )
+            user = users.filter(id=sender_id).first() if sender_id else None
+        other = users.exclude(id=user.id).order_by("id").first() if user else None
+        if user is None or other is None:
+            raise CommandError("Нужны минимум два пользователя (запустите seed_data).")
+        return user, other
+
+    async def run_variant(self, cookie, other, messages_url, send_url, options):
+        app = get_asgi_application()
+        latest = await Message.objects.order_by("-id").values_list("id", flat=True).afirst()
+        timings, errors = [], []
+
+        async def client_loop(seed):
+            rng = random.Random(seed)
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                roll = rng.random()
+                if roll < options["send_ratio"]:
+                    status = await asgi_request(
+                        app, "POST", send_url, cookie,
+                        data={"receiver_id": other.id, "text": "benchmark"},
+                    )
+                elif roll < 0.8:
+                    status = await asgi_request(
+                        app, "GET", messages_url, cookie, query={"since_id": latest or 0}
+                    )
+                else:
+                    status = await asgi_request(app, "GET", messages_url, cookie)
+                timings.append((time.perf_counter() - started) * 1000)
+                if status != 200:
+                    errors.append(status)
+
+        with ThreadSampler() as sampler:
+            started = time.perf_counter()
+            await asyncio.gather(*(client_loop(i) for i in range(options["clients"])))
+            elapsed = time.perf_counter() - started
+
+        result = summarize(timings, elapsed)
+        result.update({
+            "clients": options["clients"],
+            "errors": len(errors),
+            "threads_peak": sampler.peak,
+            "threads_extra": sampler.peak - sampler.baseline,
+        })
+        return result
+
+    def print_result(self, name, result):
+        self.stdout.write(
+            f"{name:6} {result['throughput_rps']:8.1f} rps  "
+            f"p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  "
+            f"p99 {result['p99_ms']:8.2f} мс  "
+            f"потоков на пике +{result['threads_extra']}  ошибок {result['errors']}"
+        )
@@ -0,0 +1,107 @@
+# service_desk/management/commands/benchmark_fragments.py
+
+"""
+Время рендера страниц инцидентов с кешем фрагментов и без него.
+
+    python manage.py seed_data --incidents 100000
+    python manage.py benchmark_fragments --requests 50
+
+Режимы:
+
+- cold — FRAGMENT_CACHE_TIMEOUT = 0: каждый фрагмент рендерится заново,
+         как до кеша (плюс запись в кеш);
+- warm — фрагменты уже в кеше: страница собирается из готового HTML.
+
+Для каждого режима: рендер строк одной страницы списка (без SQL), а
+также полные запросы списка и карточки инцидента через тестовый клиент.
+Рабочие данные не меняются.
+"""
+
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from service_desk import fragments
+from service_desk.models import Incident
+from service_desk.views import INCIDENTS_PAGE_SIZE
+
+from .benchmark import summarize
+
+MODES = ("cold", "warm")
+
+
+class Command(BaseCommand):
+    help = "Сравнение рендера списка и карточки инцидента с кешем фрагментов и без"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=30, help="Повторов на замер")
+        parser.add_argument("--user", help="Пользователь (по умолчанию — первый суперпользователь)")
+        parser.add_argument("-o", "--output", help="Файл JSON-отчёта")
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        user = (
+            users.filter(username=options["user"]).first() if options["user"]
+            else users.filter(is_superuser=True).order_by("id").first()
+        )
+        incident = Incident.objects.order_by("-id").first()
+        if user is None or incident is None:
+            raise CommandError("Нужны суперпользователь и инциденты (запустите seed_data).")
+
+        client = Client()
+        client.force_login(user)
+        page = list(
+            Incident.objects.select_related("service", "assigned_to")
+            .order_by("-created_at", "-id")[:INCIDENTS_PAGE_SIZE]
+        )
+        targets = {
+            "rows": lambda: fragments.incident_rows(page),
+            "list": lambda: client.get(reverse("service_desk:incidents_list")),
+            "detail": lambda: client.get(
+                reverse("service_desk:incident_detail", args=[incident.pk])
+            ),
+        }
+
+        report = {}
+        timeout = fragments.FRAGMENT_CACHE_TIMEOUT
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                for mode in MODES:
+                    fragments.FRAGMENT_CACHE_TIMEOUT = 0 if mode == "cold" else timeout
+                    report[mode] = {}
+                    for name, target in targets.items():
+                        target()  # прогрев: шаблоны, сессия, кеш во warm
+                        report[mode][name] = self.measure(target, options["requests"])
+                        self.print_result(mode, name, report[mode][name])
+        finally:
+            fragments.FRAGMENT_CACHE_TIMEOUT = timeout
+
+        for name in targets:
+            cold, warm = report["cold"][name]["p50_ms"], report["warm"][name]["p50_ms"]
+            self.stdout.write(f"{name:7} p50 быстрее в {cold / warm:.1f} раза")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Отчёт записан в {options['output']}")
+
+    def measure(self, target, repeats):
+        timings = []
+        started = time.perf_counter()
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            target()
+            timings.append((time.perf_counter() - t0) * 1000)
+        return summarize(timings, time.perf_counter() - started)
+
+    def print_result(self, mode, name, result):
+        self.stdout.write(
+            f"{mode:5} {name:7} p50 {result['p50_ms']:8.2f}  "
+            f"p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} мс"
+        )
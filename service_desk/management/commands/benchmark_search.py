@@ -0,0 +1,57 @@
+# service_desk/management/commands/benchmark_search.py
+
+"""
+Сравнение поиска по инцидентам: FTS5 против LIKE-скана (icontains).
+    python manage.py benchmark_search "принтер" "не работает" --repeat 20
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from service_desk.models import Incident
+from service_desk.search import fts_available, search_incidents
+
+
+def _like(text):
+    return Incident.objects.filter(
+        Q(comment__icontains=text) | Q(service__name__icontains=text)
+    ).order_by("-id")
+
+
+def _timed(make_queryset, repeat, limit):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = list(make_queryset()[:limit])
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings), len(rows)
+
+
+class Command(BaseCommand):
+    help = "Замер времени поиска FTS5 и icontains на текущей базе"
+
+    def add_arguments(self, parser):
+        parser.add_argument("terms", nargs="+")
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--limit", type=int, default=50)
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError("FTS5 доступен только на SQLite.")
+
+        total = Incident.objects.count()
+        self.stdout.write(f"Инцидентов: {total}")
+
+        for text in options["terms"]:
+            for name, make in (
+                ("FTS5", lambda: search_incidents(Incident.objects.all(), text)),
+                ("LIKE", lambda: _like(text)),
+            ):
+                median, worst, found = _timed(make, options["repeat"], options["limit"])
+                self.stdout.write(
+                    f"{text!r:>20} {name}: медиана {median:8.2f} мс, "
+                    f"максимум {worst:8.2f} мс, найдено {found}"
+                )
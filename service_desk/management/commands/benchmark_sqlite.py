@@ -0,0 +1,196 @@
+# service_desk/management/commands/benchmark_sqlite.py
+
+"""
+Конкурентная нагрузка на SQLite: писатели и читатели в потоках.
+
+    python manage.py benchmark_sqlite --writers 16 --readers 16 --duration 15
+    python manage.py benchmark_sqlite --modes production -o sqlite.json
+
+Для каждого режима создаётся отдельная временная БД (миграции + немного
+пользователей и услуг), рабочая БД не затрагивается:
+
+- baseline   — прежняя конфигурация: журнал DELETE, BEGIN DEFERRED,
+               подключение на каждую операцию, без повторов;
+- production — DATABASES["default"] из settings: WAL, BEGIN IMMEDIATE,
+               постоянные подключения, retry_on_lock.
+
+Писатели отправляют сообщения чата, отмечают переписку прочитанной и
+создают инциденты — теми же функциями, что и представления. Читатели
+листают историю переписки и список чатов. Отчёт: операции в секунду,
+задержки записи и число ошибок блокировки.
+"""
+
+import copy
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.test.utils import override_settings
+
+from service_desk.conversations import mark_read, recent_conversations, send_message
+from service_desk.db import is_lock_error, retry_on_lock
+from service_desk.models import Incident, Message, Service
+
+from .benchmark import summarize
+
+MODES = ("baseline", "production")
+
+USERS = 20
+SERVICES = 5
+
+
+class Command(BaseCommand):
+    help = "Сравнение конфигураций SQLite под конкурентной записью и чтением"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=10.0, help="Секунд на режим")
+        parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+        parser.add_argument("-o", "--output", help="Файл JSON-отчёта")
+
+    def handle(self, *args, **options):
+        db_settings = connections.settings["default"]
+        original = copy.deepcopy(db_settings)
+        workdir = Path(tempfile.mkdtemp(prefix="sqlite-bench-"))
+
+        report = {}
+        try:
+            for mode in options["modes"]:
+                self.use_database(db_settings, original, mode, workdir / f"{mode}.sqlite3")
+                # Прежняя конфигурация записывала без повторов
+                retries = settings.SQLITE_WRITE_RETRIES if mode == "production" else 1
+                with override_settings(SQLITE_WRITE_RETRIES=retries):
+                    self.prepare()
+                    report[mode] = self.run(options)
+                self.print_result(mode, report[mode])
+        finally:
+            connections.close_all()
+            db_settings.clear()
+            db_settings.update(original)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Отчёт записан в {options['output']}")
+
+    # ------------------------------------------------------------------
+
+    def use_database(self, db_settings, original, mode, path):
+        """Переключает подключение default на временную БД в нужном режиме."""
+        connections.close_all()
+        db_settings.clear()
+        db_settings.update(copy.deepcopy(original))
+        db_settings["NAME"] = path
+        if mode == "baseline":
+            db_settings["OPTIONS"] = {}
+            db_settings["CONN_MAX_AGE"] = 0
+            db_settings["CONN_HEALTH_CHECKS"] = False
+
+    def prepare(self):
+        call_command("migrate", verbosity=0, interactive=False)
+        User.objects.bulk_create(User(username=f"bench{i}") for i in range(USERS))
+        Service.objects.bulk_create(
+            Service(name=f"Услуга {i}", price=100) for i in range(SERVICES)
+        )
+        connections.close_all()
+
+    def run(self, options):
+        users = list(User.objects.all())
+        services = list(Service.objects.values_list("id", flat=True))
+        connection.close()
+
+        deadline = time.monotonic() + options["duration"]
+        lock = threading.Lock()
+        result = {"writes": [], "reads": 0, "lock_errors": 0, "other_errors": 0}
+
+        def write_once(rng):
+            kind = rng.random()
+            sender, receiver = rng.sample(users, 2)
+            if kind < 0.5:
+                send_message(sender, receiver, "нагрузочное сообщение")
+            elif kind < 0.75:
+                mark_read(receiver.id, sender.id)
+            else:
+                incident = Incident(service_id=rng.choice(services), comment="нагрузка")
+                retry_on_lock(incident.save)()
+
+        def read_once(rng):
+            sender, receiver = rng.sample(users, 2)
+            if rng.random() < 0.5:
+                list(
+                    Message.objects.filter(sender=sender, receiver=receiver)
+                    .order_by("-id")[:50]
+                )
+            else:
+                recent_conversations(sender.id, 30)
+
+        def worker(is_writer, seed):
+            rng = random.Random(seed)
+            writes, reads, lock_errors, other_errors = [], 0, 0, 0
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    if is_writer:
+                        write_once(rng)
+                        writes.append((time.perf_counter() - started) * 1000)
+                    else:
+                        read_once(rng)
+                        reads += 1
+                except OperationalError as exc:
+                    if is_lock_error(exc):
+                        lock_errors += 1
+                    else:
+                        other_errors += 1
+                # Как в конце запроса: закрыть подключение, если истёк CONN_MAX_AGE
+                close_old_connections()
+            connection.close()
+
+            with lock:
+                result["writes"].extend(writes)
+                result["reads"] += reads
+                result["lock_errors"] += lock_errors
+                result["other_errors"] += other_errors
+
+        threads = [
+            threading.Thread(target=worker, args=(True, i)) for i in range(options["writers"])
+        ] + [
+            threading.Thread(target=worker, args=(False, -i - 1)) for i in range(options["readers"])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        writes = result.pop("writes")
+        result.update({
+            "writers": options["writers"],
+            "readers": options["readers"],
+            "seconds": round(elapsed, 2),
+            "reads_per_second": round(result["reads"] / elapsed, 1),
+            "write": summarize(writes, elapsed) if writes else {"requests": 0},
+        })
+        return result
+
+    def print_result(self, mode, result):
+        write = result["write"]
+        line = (
+            f"{mode:11} запись {write.get('throughput_rps', 0):8.1f}/с "
+            f"(p95 {write.get('p95_ms', 0):8.2f} мс, p99 {write.get('p99_ms', 0):8.2f} мс)  "
+            f"чтение {result['reads_per_second']:8.1f}/с  "
+            f"ошибок блокировки {result['lock_errors']}"
+        )
+        style = self.style.ERROR if result["lock_errors"] or result["other_errors"] else self.style.SUCCESS
+        self.stdout.write(style(line))
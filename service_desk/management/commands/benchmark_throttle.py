@@ -0,0 +1,222 @@
+# service_desk/management/commands/benchmark_throttle.py
+
+"""
+Задержки персонала во время флуда публичных заявок.
+
+    python manage.py benchmark_throttle --flooders 16 --staff 4 --duration 15
+
+Как и benchmark_sqlite, каждый режим работает на своей временной БД в
+конфигурации production; рабочая БД не затрагивается. Запросы идут через
+тестовый клиент Django (весь стек middleware) из потоков:
+
+- idle        — только персонал, без флуда: эталон задержек;
+- unprotected — флуд при THROTTLE_ENABLED = False;
+- protected   — флуд с ограничением частоты и сбросом нагрузки
+                (service_desk/throttle.py).
+
+Флудеры отправляют форму /request/ анонимно, источник задаёт --flood:
+
+- ip     — все запросы с одного IP: флуд останавливает лимит на IP;
+- botnet — каждый запрос с нового IP: лимит на IP не срабатывает,
+           сброс нагрузки по времени записи лишь разгружает БД.
+           Флудеры и персонал здесь делят один процесс и GIL, поэтому
+           даже отклонённые запросы отнимают у персонала CPU; от такого
+           флуда защищает лимит на балансировщике, а не в приложении.
+
+Персонал (админ) открывает список инцидентов, а каждым четвёртым
+запросом меняет статус инцидента. Ведра ограничения лежат в отдельном
+файловом кеше во временном каталоге, как в production, но без следов
+прошлых запусков.
+
+Отчёт: p50/p95/p99 запросов персонала, принятые и отклонённые (429)
+заявки.
+"""
+
+import copy
+import json
+import logging
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from service_desk.models import Incident, Service
+from service_desk.throttle import write_latency
+
+from .benchmark import summarize
+from .benchmark_sqlite import Command as SqliteBenchmarkCommand
+
+MODES = ("idle", "unprotected", "protected")
+FLOODS = ("ip", "botnet")
+
+STAFF_USERNAME = "bench-admin"
+INITIAL_INCIDENTS = 500
+
+
+class Command(SqliteBenchmarkCommand):
+    help = "Задержки запросов персонала во время флуда публичной формы заявок"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--flooders", type=int, default=16, help="Потоков флуда")
+        parser.add_argument("--staff", type=int, default=4, help="Потоков персонала")
+        parser.add_argument("--duration", type=float, default=10.0, help="Секунд на режим")
+        parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+        parser.add_argument("--flood", choices=FLOODS, default="ip",
+                            help="Флуд с одного IP или с нового IP на каждый запрос")
+        parser.add_argument("-o", "--output", help="Файл JSON-отчёта")
+
+    def handle(self, *args, **options):
+        db_settings = connections.settings["default"]
+        original = copy.deepcopy(db_settings)
+        workdir = Path(tempfile.mkdtemp(prefix="throttle-bench-"))
+
+        # Каждый ответ 429 иначе попадёт в лог django.request
+        request_logger = logging.getLogger("django.request")
+        log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+
+        report = {}
+        try:
+            for mode in options["modes"]:
+                self.use_database(db_settings, original, "production", workdir / f"{mode}.sqlite3")
+                with override_settings(
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                    THROTTLE_ENABLED=mode == "protected",
+                    CACHES={"default": {
+                        "BACKEND": "service_desk.cache.FileBasedCache",
+                        "LOCATION": workdir / f"{mode}-cache",
+                    }},
+                ):
+                    self.prepare()
+                    write_latency.reset()
+                    report[mode] = self.run(mode, options)
+                self.print_result(mode, report[mode])
+        finally:
+            request_logger.setLevel(log_level)
+            connections.close_all()
+            db_settings.clear()
+            db_settings.update(original)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Отчёт записан в {options['output']}")
+
+    def prepare(self):
+        super().prepare()
+        User.objects.create_superuser(STAFF_USERNAME, password=None)
+        services = list(Service.objects.all())
+        Incident.objects.bulk_create(
+            Incident(service=services[i % len(services)], comment="нагрузка")
+            for i in range(INITIAL_INCIDENTS)
+        )
+        connections.close_all()
+
+    def run(self, mode, options):
+        staff = User.objects.get(username=STAFF_USERNAME)
+        services = list(Service.objects.values_list("id", flat=True))
+        incidents = list(Incident.objects.values_list("id", flat=True))
+        statuses = [code for code, _ in Incident.STATUS_CHOICES]
+        connection.close()
+
+        list_url = reverse("service_desk:incidents_list")
+        submit_url = reverse("service_desk:create_incident_public")
+        deadline = time.monotonic() + options["duration"]
+        lock = threading.Lock()
+        staff_timings, submissions = [], {"accepted": 0, "rejected": 0, "errors": 0}
+        staff_errors = []
+
+        def staff_loop(seed):
+            rng = random.Random(seed)
+            client = Client()
+            client.force_login(staff)
+            timings, errors, n = [], [], 0
+            while time.monotonic() < deadline:
+                n += 1
+                started = time.perf_counter()
+                if n % 4:
+                    response = client.get(list_url)
+                    ok = response.status_code == 200
+                else:
+                    response = client.post(
+                        reverse("service_desk:incident_detail", args=[rng.choice(incidents)]),
+                        {"action": "status", "status": rng.choice(statuses)},
+                    )
+                    ok = response.status_code == 302
+                timings.append((time.perf_counter() - started) * 1000)
+                if not ok:
+                    errors.append(response.status_code)
+            connection.close()
+            with lock:
+                staff_timings.extend(timings)
+                staff_errors.extend(errors)
+
+        def flood_loop(seed):
+            rng = random.Random(seed)
+            counts = dict.fromkeys(submissions, 0)
+            client = Client(REMOTE_ADDR="10.0.0.1")
+            while time.monotonic() < deadline:
+                if options["flood"] == "botnet":
+                    client = Client(
+                        REMOTE_ADDR=f"10.{seed % 256}.{rng.randrange(256)}.{rng.randrange(256)}"
+                    )
+                response = client.post(
+                    submit_url, {"service": rng.choice(services), "comment": "флуд"}
+                )
+                if response.status_code == 200:
+                    counts["accepted"] += 1
+                elif response.status_code == 429:
+                    counts["rejected"] += 1
+                else:
+                    counts["errors"] += 1
+            connection.close()
+            with lock:
+                for key, value in counts.items():
+                    submissions[key] += value
+
+        threads = [
+            threading.Thread(target=staff_loop, args=(i,)) for i in range(options["staff"])
+        ]
+        if mode != "idle":
+            threads += [
+                threading.Thread(target=flood_loop, args=(i,))
+                for i in range(options["flooders"])
+            ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        result = {"staff": summarize(staff_timings, elapsed), "staff_errors": len(staff_errors)}
+        if mode != "idle":
+            result["flood"] = options["flood"]
+            result["submissions"] = submissions
+            result["accepted_per_second"] = round(submissions["accepted"] / elapsed, 1)
+        return result
+
+    def print_result(self, mode, result):
+        staff = result["staff"]
+        line = (
+            f"{mode:11} персонал {staff['throughput_rps']:7.1f} rps  "
+            f"p50 {staff['p50_ms']:8.2f}  p95 {staff['p95_ms']:8.2f}  "
+            f"p99 {staff['p99_ms']:8.2f} мс  ошибок {result['staff_errors']}"
+        )
+        if "submissions" in result:
+            submissions = result["submissions"]
+            line += (
+                f"  | заявки: принято {submissions['accepted']} "
+                f"({result['accepted_per_second']}/с), 429 — {submissions['rejected']}"
+            )
+        self.stdout.write(line)
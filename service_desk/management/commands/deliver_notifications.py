@@ -0,0 +1,60 @@
+# service_desk/management/commands/deliver_notifications.py
+
+"""
+Воркер доставки уведомлений техникам из outbox (service_desk/outbox.py).
+
+    python manage.py deliver_notifications              # работает, пока не остановят
+    python manage.py deliver_notifications --once       # разобрать очередь и выйти
+
+Пачками забирает готовые строки outbox, склеивает их по инциденту и
+получателю и отправляет через NOTIFICATION_SENDER. Когда очередь пуста,
+спит --interval секунд. Можно запускать несколько воркеров: захваченные
+строки другим не достаются до конца аренды.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from service_desk import outbox
+from service_desk.notifications import get_sender
+
+
+class Command(BaseCommand):
+    help = "Доставляет уведомления техникам из outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=outbox.OUTBOX_BATCH_SIZE)
+        parser.add_argument("--interval", type=float, default=1.0,
+                            help="Пауза (сек), когда очередь пуста")
+        parser.add_argument("--once", action="store_true", help="Разобрать очередь и выйти")
+
+    def handle(self, *args, **options):
+        sender = get_sender()
+        total_sent = total_errors = 0
+
+        try:
+            while True:
+                messages = outbox.claim(options["batch_size"])
+                if messages:
+                    sent, errors = outbox.deliver(messages, sender)
+                    total_sent += sent
+                    total_errors += errors
+                    if options["verbosity"] > 1 or errors:
+                        self.stdout.write(
+                            f"строк {len(messages)}: доставлено {sent}, ошибок {errors}"
+                        )
+                    continue
+
+                if options["once"]:
+                    break
+                # Между пачками, как между запросами: закрыть устаревшее подключение
+                close_old_connections()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Доставлено уведомлений: {total_sent}, ошибок отправки: {total_errors}"
+        ))
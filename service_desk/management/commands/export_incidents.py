@@ -0,0 +1,50 @@
+# service_desk/management/commands/export_incidents.py
+
+"""
+Выгрузка инцидентов:
+    python manage.py export_incidents --format jsonl --status new -o new.jsonl
+    python manage.py export_incidents --q принтер
+
+Фильтры совпадают с фильтрами списка инцидентов.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from service_desk.export import EXPORT_FORMATS, iter_export
+from service_desk.forms import IncidentFilterForm
+from service_desk.models import Incident
+from service_desk.search import filter_matching
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка инцидентов в CSV или JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("-o", "--output", help="Файл (по умолчанию stdout)")
+        parser.add_argument("--q", help="Полнотекстовый поиск, как в списке")
+        parser.add_argument("--status")
+        parser.add_argument("--service", help="id услуги")
+        parser.add_argument("--assigned-to", help='id техника или "none"')
+
+    def handle(self, *args, **options):
+        filter_form = IncidentFilterForm({
+            "q": options["q"] or "",
+            "status": options["status"] or "",
+            "service": options["service"] or "",
+            "assigned_to": options["assigned_to"] or "",
+        })
+        if not filter_form.is_valid():
+            raise CommandError(filter_form.errors.as_text())
+
+        incidents = filter_form.filter(Incident.objects.all())
+        if filter_form.search_text:
+            incidents = filter_matching(incidents, filter_form.search_text)
+        chunks = iter_export(incidents, options["format"])
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
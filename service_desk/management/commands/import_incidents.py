@@ -0,0 +1,189 @@
+# service_desk/management/commands/import_incidents.py
+
+"""
+Импорт инцидентов из CSV / JSONL (колонки как у export_incidents):
+    python manage.py import_incidents tickets.csv --batch-size 5000
+
+Файл читается потоково, строки вставляются пачками через bulk_create,
+каждая пачка — в своей транзакции вместе с позицией в ImportCheckpoint.
+Счётчики статистики панели обновляются в той же транзакции.
+Повторный запуск с тем же файлом (или --job) продолжает с последней
+закоммиченной пачки; --restart начинает заново.
+"""
+
+import csv
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from service_desk import events, stats
+from service_desk.models import ImportCheckpoint, Incident, Service
+
+STATUSES = dict(Incident.STATUS_CHOICES)
+
+
+class RowError(ValueError):
+    pass
+
+
+def _read_rows(path, fmt):
+    """
+    Словари строк файла по одной, без загрузки файла в память.
+    Вместо нечитаемой строки JSONL отдаётся RowError — импорт идёт дальше.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield RowError(f"некорректный JSON: {exc.msg}")
+                    continue
+                yield row if isinstance(row, dict) else RowError("ожидался JSON-объект")
+
+
+def _text(row, column):
+    """Строковое значение колонки (в JSONL там может оказаться число или null)."""
+    value = row.get(column)
+    return "" if value is None else str(value).strip()
+
+
+@contextmanager
+def _keep_created_at():
+    """Отключает auto_now_add, чтобы сохранить исходные даты заявок."""
+    field = Incident._meta.get_field("created_at")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Пакетный импорт инцидентов из CSV или JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=("csv", "jsonl"),
+                            help="По умолчанию — по расширению файла")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--job", help="Имя задания для checkpoint (по умолчанию — путь файла)")
+        parser.add_argument("--restart", action="store_true",
+                            help="Игнорировать сохранённую позицию")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"Файл не найден: {path}")
+
+        fmt = options["format"] or ("jsonl" if path.suffix in (".jsonl", ".ndjson") else "csv")
+        batch_size = options["batch_size"]
+        job = options["job"] or str(path.resolve())
+
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(name=job)
+        if options["restart"]:
+            checkpoint.position = 0
+        start = checkpoint.position
+        if start:
+            self.stdout.write(f"Продолжаю с строки {start + 1}")
+
+        self.services = dict(Service.objects.values_list("name", "id"))
+        self.users = dict(User.objects.values_list("username", "id"))
+
+        rows = islice(enumerate(_read_rows(path, fmt), start=1), start, None)
+        imported = errors = 0
+        started = time.monotonic()
+
+        with _keep_created_at():
+            while True:
+                chunk = list(islice(rows, batch_size))
+                if not chunk:
+                    break
+
+                batch = []
+                for line_no, row in chunk:
+                    try:
+                        if isinstance(row, RowError):
+                            raise row
+                        batch.append(self.build_incident(row))
+                    except ValueError as exc:
+                        # RowError и ошибки разбора значений (например, даты 2024-13-45)
+                        errors += 1
+                        self.stderr.write(f"Строка {line_no}: {exc}")
+
+                with transaction.atomic():
+                    Incident.objects.bulk_create(batch)
+                    # bulk_create не шлёт сигналы — счётчики панели и журнал ведём сами
+                    stats.apply_deltas(Counter(
+                        stats.bucket_of(i.service_id, i.assigned_to_id, i.status)
+                        for i in batch
+                    ))
+                    events.record_created(batch, notify=False)
+                    checkpoint.position = chunk[-1][0]
+                    checkpoint.save(update_fields=["position", "updated_at"])
+
+                imported += len(batch)
+                rate = imported / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(
+                    f"  {checkpoint.position} строк, импортировано {imported} "
+                    f"({rate:.0f} строк/с), ошибок {errors}"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: импортировано {imported}, ошибок {errors}"
+        ))
+
+    def build_incident(self, row):
+        service_id = self.services.get(_text(row, "service"))
+        if service_id is None:
+            raise RowError(f"неизвестная услуга {row.get('service')!r}")
+
+        comment = _text(row, "comment")
+        if not comment:
+            raise RowError("пустой комментарий")
+
+        status = _text(row, "status") or "new"
+        if status not in STATUSES:
+            raise RowError(f"неизвестный статус {status!r}")
+
+        created_at = timezone.now()
+        if row.get("created_at"):
+            try:
+                created_at = parse_datetime(str(row["created_at"]))
+            except ValueError:
+                # Формат верный, но такой даты нет
+                created_at = None
+            if created_at is None:
+                raise RowError(f"неверная дата {row['created_at']!r}")
+            if timezone.is_naive(created_at):
+                created_at = timezone.make_aware(created_at)
+
+        return Incident(
+            service_id=service_id,
+            comment=comment,
+            status=status,
+            created_at=created_at,
+            created_by_id=self._user_id(row, "created_by"),
+            assigned_to_id=self._user_id(row, "assigned_to"),
+        )
+
+    def _user_id(self, row, column):
+        username = _text(row, column)
+        if not username:
+            return None
+        if username not in self.users:
+            raise RowError(f"неизвестный пользователь {username!r} в {column}")
+        return self.users[username]
@@ -0,0 +1,23 @@
+# service_desk/management/commands/rebalance_incidents.py
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from service_desk.assignment import assign_backlog
+
+
+class Command(BaseCommand):
+    help = "Распределяет все открытые неназначенные инциденты по наименее загруженным техникам"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        assigned = assign_backlog(options["batch_size"])
+
+        names = dict(User.objects.filter(id__in=assigned).values_list("id", "username"))
+        for tech_id, count in sorted(assigned.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {names.get(tech_id, tech_id)}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: назначено {sum(assigned.values())} инцидентов"
+        ))
@@ -0,0 +1,16 @@
+# service_desk/management/commands/rebuild_incident_stats.py
+
+from django.core.management.base import BaseCommand
+
+from service_desk import stats
+from service_desk.models import IncidentStat
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики статистики инцидентов (исправление расхождений)"
+
+    def handle(self, *args, **options):
+        stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово, счётчиков: {IncidentStat.objects.count()}"
+        ))
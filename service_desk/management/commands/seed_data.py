@@ -0,0 +1,149 @@
+# service_desk/management/commands/seed_data.py
+
+"""
+Синтетические данные для нагрузочных тестов и бенчмарков:
+    python manage.py seed_data --incidents 100000 --messages 200000
+
+Создаёт услуги, техников (группа Tech), сотрудников, инциденты и
+сообщения чата пачками через bulk_create. Все пользователи получают
+пароль --password; администратор bench_admin создаётся, если его нет.
+"""
+
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from service_desk import conversations, events, stats
+from service_desk.models import Incident, Message, Service
+from service_desk.roles import TECH_GROUP
+
+WORDS = (
+    "не работает принтер бумага замялась нет интернета ноутбук сломался "
+    "медленно греется пароль забыл почта монитор мерцает звук пропал "
+    "клавиатура сервер недоступен доступ отказано обновление ошибка"
+).split()
+
+
+def _text(rng, words=12):
+    return " ".join(rng.choices(WORDS, k=words))
+
+
+class Command(BaseCommand):
+    help = "Генерирует синтетические услуги, пользователей, инциденты и сообщения"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--services", type=int, default=20)
+        parser.add_argument("--techs", type=int, default=20)
+        parser.add_argument("--employees", type=int, default=200)
+        parser.add_argument("--incidents", type=int, default=10000)
+        parser.add_argument("--messages", type=int, default=10000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--password", default="bench12345")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.password = make_password(options["password"])
+        self.prefix = f"seed{int(time.time())}"
+
+        services = self.seed_services(options["services"])
+        techs = self.seed_users("tech", options["techs"])
+        employees = self.seed_users("emp", options["employees"])
+
+        Group.objects.get_or_create(name=TECH_GROUP)[0].user_set.add(*techs)
+        if not User.objects.filter(username="bench_admin").exists():
+            User.objects.create_superuser("bench_admin", "", options["password"])
+
+        self.seed_incidents(options["incidents"], services, techs, employees)
+        self.seed_messages(options["messages"], techs + employees)
+
+        # bulk_create обходит сигналы и record_message — пересчитываем
+        # счётчики панели и сводки переписки целиком
+        stats.rebuild()
+        conversations.rebuild()
+        self.stdout.write(self.style.SUCCESS("Готово"))
+
+    def _bulk(self, model, objects):
+        started = time.monotonic()
+        created = 0
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                created += self._flush(model, batch)
+                batch = []
+        created += self._flush(model, batch)
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(
+            f"  {model._meta.verbose_name_plural}: {created} "
+            f"({created / elapsed:.0f} строк/с)"
+        )
+
+    def _flush(self, model, batch):
+        if batch:
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+                if model is Incident:
+                    # bulk_create не шлёт сигналы — события создания пишем сами
+                    events.record_created(batch, notify=False)
+        return len(batch)
+
+    def seed_services(self, count):
+        self._bulk(Service, (
+            Service(
+                name=f"Услуга {self.prefix}-{i}",
+                description=_text(self.rng, 20),
+                price=self.rng.randint(100, 10000),
+            )
+            for i in range(count)
+        ))
+        return list(Service.objects.filter(
+            name__startswith=f"Услуга {self.prefix}-"
+        ).values_list("id", flat=True))
+
+    def seed_users(self, kind, count):
+        self._bulk(User, (
+            User(username=f"{self.prefix}-{kind}{i}", password=self.password)
+            for i in range(count)
+        ))
+        return list(User.objects.filter(
+            username__startswith=f"{self.prefix}-{kind}"
+        ).values_list("id", flat=True))
+
+    def seed_incidents(self, count, services, techs, employees):
+        if not services:
+            return
+        rng = self.rng
+        statuses = [value for value, _ in Incident.STATUS_CHOICES]
+        self._bulk(Incident, (
+            Incident(
+                service_id=rng.choice(services),
+                comment=_text(rng),
+                status=rng.choice(statuses),
+                created_by_id=rng.choice(employees) if employees else None,
+                assigned_to_id=rng.choice(techs) if techs and rng.random() < 0.7 else None,
+            )
+            for _ in range(count)
+        ))
+
+    def seed_messages(self, count, users):
+        if len(users) < 2:
+            return
+        rng = self.rng
+        # Переписки сосредоточены на ограниченном числе пар, как в жизни
+        pairs = [tuple(rng.sample(users, 2)) for _ in range(max(count // 100, 1))]
+
+        def messages():
+            for _ in range(count):
+                sender, receiver = rng.choice(pairs)
+                if rng.random() < 0.5:
+                    sender, receiver = receiver, sender
+                yield Message(sender_id=sender, receiver_id=receiver, text=_text(rng, 6))
+
+        self._bulk(Message, messages())
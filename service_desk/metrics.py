@@ -0,0 +1,257 @@
+# service_desk/metrics.py
+
+"""
+Метрики запросов по представлениям: число запросов, гистограмма
+задержек, SQL-запросы (число и время) и размер ответа.
+
+Счётчики хранятся в памяти процесса. Если задан settings.METRICS_DIR,
+каждый воркер раз в METRICS_FLUSH_INTERVAL секунд сбрасывает свой
+снимок в METRICS_DIR/<pid>.json, а эндпоинт метрик суммирует снимки
+всех воркеров (как multiprocess-режим prometheus_client). Воркер
+удаляет свой снимок при выходе; снимки процессов, завершившихся без
+этого (kill -9), удаляет collect(). Счётчики такого воркера пропадают
+из суммы — для Prometheus это обычный сброс счётчика.
+
+SQL считается обёрткой, которая ставится на каждое подключение к БД и
+пишет в объект текущего запроса из contextvar — поэтому учитываются и
+запросы из sync_to_async в асинхронных представлениях.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_PREFIX = "service_desk"
+
+_current_sample = ContextVar("service_desk_metrics_sample", default=None)
+
+
+class RequestSample:
+    __slots__ = ("started", "queries", "query_time")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+
+
+def _empty_view_stats():
+    return {
+        "requests": 0,
+        "latency_buckets": [0] * len(LATENCY_BUCKETS),
+        "latency_sum": 0.0,
+        "queries": 0,
+        "query_seconds": 0.0,
+        "response_bytes": 0,
+        "budget_exceeded": 0,
+    }
+
+
+def _merge(target, source):
+    for view, values in source.items():
+        stats = target.setdefault(view, _empty_view_stats())
+        for key, value in values.items():
+            if key == "latency_buckets":
+                stats[key] = [a + b for a, b in zip(stats[key], value)]
+            else:
+                stats[key] += value
+    return target
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но чужой
+        return True
+    return True
+
+
+class MetricsStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._last_flush = time.monotonic()
+        self._snapshot_path = None
+
+    def record(self, view, duration, sample, response_bytes, over_budget):
+        with self._lock:
+            stats = self._views.setdefault(view, _empty_view_stats())
+            stats["requests"] += 1
+            stats["latency_sum"] += duration
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    stats["latency_buckets"][i] += 1
+                    break
+            stats["queries"] += sample.queries
+            stats["query_seconds"] += sample.query_time
+            stats["response_bytes"] += response_bytes
+            stats["budget_exceeded"] += over_budget
+
+        self._maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self._views))
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    # --- агрегация по воркерам ---
+
+    def _maybe_flush(self):
+        directory = getattr(settings, "METRICS_DIR", None)
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 5)
+        now = time.monotonic()
+        if not directory or now - self._last_flush < interval:
+            return
+        self._last_flush = now
+        self.flush(directory)
+
+    def flush(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+        if self._snapshot_path != path:
+            self._snapshot_path = path
+            atexit.register(self.remove_snapshot)
+
+    def remove_snapshot(self):
+        """Удаляет снимок этого процесса (при выходе воркера)."""
+        path, self._snapshot_path = self._snapshot_path, None
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def collect(self):
+        """Снимок всех воркеров: свои счётчики + файлы остальных."""
+        views = self.snapshot()
+        directory = getattr(settings, "METRICS_DIR", None)
+        if not directory:
+            return views
+
+        own = os.getpid()
+        for path in Path(directory).glob("*.json"):
+            pid = int(path.stem) if path.stem.isdigit() else None
+            if pid == own:
+                continue
+            if pid is not None and not _pid_alive(pid):
+                # Воркер завершился, не убрав снимок
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                _merge(views, json.loads(path.read_text()))
+            except (OSError, ValueError):
+                logger.warning("Не удалось прочитать снимок метрик %s", path)
+        return views
+
+
+store = MetricsStore()
+
+
+# ------------------------- SQL-обёртка ----------------------------
+
+def _count_queries(execute, sql, params, many, context):
+    sample = _current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.query_time += time.perf_counter() - started
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """Обработчик connection_created: ставит обёртку на подключение один раз."""
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+def begin_request():
+    sample = RequestSample()
+    return sample, _current_sample.set(sample)
+
+
+def finish_request(request, response, sample, token):
+    _current_sample.reset(token)
+    duration = time.perf_counter() - sample.started
+
+    match = getattr(request, "resolver_match", None)
+    view = match.view_name if match else "<unresolved>"
+
+    response_bytes = 0 if response.streaming else len(response.content)
+
+    budget = getattr(settings, "METRICS_QUERY_BUDGET", None)
+    over_budget = budget is not None and sample.queries > budget
+    if over_budget:
+        logger.warning(
+            "Превышен бюджет SQL-запросов: %s %s — %d запросов (бюджет %d)",
+            view, request.path, sample.queries, budget,
+        )
+
+    store.record(view, duration, sample, response_bytes, over_budget)
+
+
+# --------------------- Формат Prometheus --------------------------
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(views):
+    lines = []
+
+    def metric(name, kind, help_text):
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+    def sample(name, view, value, extra=""):
+        lines.append(f'{METRIC_PREFIX}_{name}{{view="{_label(view)}"{extra}}} {value}')
+
+    metric("requests_total", "counter", "Число запросов")
+    for view, stats in sorted(views.items()):
+        sample("requests_total", view, stats["requests"])
+
+    metric("request_duration_seconds", "histogram", "Время обработки запроса")
+    for view, stats in sorted(views.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats["latency_buckets"]):
+            cumulative += count
+            sample("request_duration_seconds_bucket", view, cumulative, f',le="{bound}"')
+        sample("request_duration_seconds_bucket", view, stats["requests"], ',le="+Inf"')
+        sample("request_duration_seconds_sum", view, round(stats["latency_sum"], 6))
+        sample("request_duration_seconds_count", view, stats["requests"])
+
+    for name, key, help_text in (
+        ("db_queries_total", "queries", "Число SQL-запросов"),
+        ("db_query_seconds_total", "query_seconds", "Время SQL-запросов"),
+        ("response_bytes_total", "response_bytes", "Размер ответов (без потоковых)"),
+        ("query_budget_exceeded_total", "budget_exceeded",
+         "Запросы сверх METRICS_QUERY_BUDGET SQL-запросов"),
+    ):
+        metric(name, "counter", help_text)
+        for view, stats in sorted(views.items()):
+            value = stats[key]
+            sample(name, view, round(value, 6) if isinstance(value, float) else value)
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,45 @@
+# service_desk/middleware.py
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from . import metrics
+from .roles import get_roles
+
+
+class RolesMiddleware(MiddlewareMixin):
+    """Добавляет request.roles — роли текущего пользователя (лениво)."""
+
+    def process_request(self, request):
+        request.roles = SimpleLazyObject(lambda: get_roles(request.user))
+
+
+class MetricsMiddleware:
+    """
+    Собирает метрики запроса (service_desk/metrics.py). Ставится первым
+    в MIDDLEWARE, чтобы задержка включала всю цепочку.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        sample, token = metrics.begin_request()
+        response = self.get_response(request)
+        metrics.finish_request(request, response, sample, token)
+        return response
+
+    async def __acall__(self, request):
+        sample, token = metrics.begin_request()
+        response = await self.get_response(request)
+        metrics.finish_request(request, response, sample, token)
+        return response
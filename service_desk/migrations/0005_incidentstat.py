@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_stats(apps, schema_editor):
+    Incident = apps.get_model('service_desk', 'Incident')
+    IncidentStat = apps.get_model('service_desk', 'IncidentStat')
+
+    rows = (
+        Incident.objects.order_by()
+        .values('service_id', 'assigned_to_id', 'status')
+        .annotate(n=Count('id'))
+    )
+    IncidentStat.objects.bulk_create([
+        IncidentStat(
+            service_id=row['service_id'],
+            technician_id=row['assigned_to_id'] or 0,
+            status=row['status'],
+            count=row['n'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_desk', '0004_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('technician_id', models.BigIntegerField(default=0, verbose_name='Техник')),
+                ('status', models.CharField(choices=[('new', 'Новая'), ('in_progress', 'В работе'), ('done', 'Выполнена'), ('cancelled', 'Отменена')], max_length=20, verbose_name='Статус')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='service_desk.service')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('service', 'technician_id', 'status'), name='incident_stat_bucket_unique')],
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+from django.db import migrations
+
+FTS_TABLE = 'service_desk_incident_fts'
+
+FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        comment, service_name, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER service_desk_incident_fts_insert
+    AFTER INSERT ON service_desk_incident BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, comment, service_name)
+        VALUES (
+            new.id, new.comment,
+            (SELECT name FROM service_desk_service WHERE id = new.service_id)
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER service_desk_incident_fts_update
+    AFTER UPDATE OF comment, service_id ON service_desk_incident
+    WHEN new.comment IS NOT old.comment OR new.service_id IS NOT old.service_id
+    BEGIN
+        UPDATE {FTS_TABLE}
+        SET comment = new.comment,
+            service_name = (SELECT name FROM service_desk_service WHERE id = new.service_id)
+        WHERE rowid = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER service_desk_incident_fts_delete
+    AFTER DELETE ON service_desk_incident BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER service_desk_service_fts_rename
+    AFTER UPDATE OF name ON service_desk_service
+    WHEN new.name IS NOT old.name
+    BEGIN
+        UPDATE {FTS_TABLE} SET service_name = new.name
+        WHERE rowid IN (SELECT id FROM service_desk_incident WHERE service_id = new.id);
+    END
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, comment, service_name)
+    SELECT i.id, i.comment, s.name
+    FROM service_desk_incident i JOIN service_desk_service s ON s.id = i.service_id
+    """,
+]
+
+BACKWARD = [
+    "DROP TRIGGER IF EXISTS service_desk_service_fts_rename",
+    "DROP TRIGGER IF EXISTS service_desk_incident_fts_delete",
+    "DROP TRIGGER IF EXISTS service_desk_incident_fts_update",
+    "DROP TRIGGER IF EXISTS service_desk_incident_fts_insert",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 есть только в SQLite; на других СУБД поиск работает через icontains
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_desk', '0005_incidentstat'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD), _run(BACKWARD)),
+    ]
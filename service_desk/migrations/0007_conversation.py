@@ -0,0 +1,67 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def fill_conversations(apps, schema_editor):
+    """
+    Сводки для существующей переписки; история считается прочитанной.
+    То же, что conversations.rebuild(), но на исторических моделях.
+    """
+    Message = apps.get_model('service_desk', 'Message')
+    Conversation = apps.get_model('service_desk', 'Conversation')
+
+    last_ids = {}
+    for row in Message.objects.order_by().values('sender_id', 'receiver_id').annotate(last=Max('id')):
+        pair = tuple(sorted((row['sender_id'], row['receiver_id'])))
+        last_ids[pair] = max(last_ids.get(pair, 0), row['last'])
+
+    last_messages = Message.objects.in_bulk(list(last_ids.values()))
+    Conversation.objects.bulk_create([
+        Conversation(
+            user_low_id=low,
+            user_high_id=high,
+            last_message_id=message_id,
+            last_message_at=last_messages[message_id].created_at,
+            last_message_text=last_messages[message_id].text[:200],
+            last_sender_id=last_messages[message_id].sender_id,
+            read_low_id=message_id,
+            read_high_id=message_id,
+        )
+        for (low, high), message_id in last_ids.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_desk', '0006_incident_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_id', models.BigIntegerField(default=0)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('last_message_text', models.CharField(blank=True, max_length=200)),
+                ('last_sender_id', models.BigIntegerField(blank=True, null=True)),
+                ('unread_low', models.PositiveIntegerField(default=0)),
+                ('unread_high', models.PositiveIntegerField(default=0)),
+                ('read_low_id', models.BigIntegerField(default=0)),
+                ('read_high_id', models.BigIntegerField(default=0)),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_low', 'last_message_id'], name='conversation_low_idx'), models.Index(fields=['user_high', 'last_message_id'], name='conversation_high_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user_low', 'user_high'), name='conversation_pair_unique')],
+            },
+        ),
+        migrations.RunPython(fill_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:22
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+fts = import_module('service_desk.migrations.0006_incident_fts')
+
+# SQLite пересоздаёт таблицу при AddField, а триггеры FTS ссылаются на неё —
+# снимаем их на время операции и ставим обратно (содержимое FTS не меняется)
+FTS_TRIGGERS = fts.FORWARD[1:5]
+DROP_FTS_TRIGGERS = fts.BACKWARD[:4]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_desk', '0008_messagearchivesegment'),
+    ]
+
+    operations = [
+        migrations.RunPython(fts._run(DROP_FTS_TRIGGERS), fts._run(FTS_TRIGGERS)),
+        migrations.AddField(
+            model_name='incident',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='Версия'),
+        ),
+        migrations.RunPython(fts._run(FTS_TRIGGERS), fts._run(DROP_FTS_TRIGGERS)),
+    ]
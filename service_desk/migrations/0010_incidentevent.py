@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# История начинается с события "created" для каждого существующего инцидента
+# (состояние — текущее: прежние изменения нигде не сохранялись)
+BACKFILL = """
+    INSERT INTO service_desk_incidentevent
+        (incident_id, kind, status, assigned_to_id, previous_status,
+         previous_assigned_to_id, version, actor_id, created_at)
+    SELECT id, 'created', status, assigned_to_id, '', NULL, version, created_by_id, created_at
+    FROM service_desk_incident
+    ORDER BY id
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_desk', '0009_incident_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('incident_id', models.BigIntegerField(verbose_name='Инцидент')),
+                ('kind', models.CharField(choices=[('created', 'Создан'), ('updated', 'Изменён'), ('deleted', 'Удалён')], max_length=10, verbose_name='Событие')),
+                ('status', models.CharField(choices=[('new', 'Новая'), ('in_progress', 'В работе'), ('done', 'Выполнена'), ('cancelled', 'Отменена')], max_length=20, verbose_name='Статус')),
+                ('assigned_to_id', models.BigIntegerField(blank=True, null=True, verbose_name='Назначено')),
+                ('previous_status', models.CharField(blank=True, choices=[('new', 'Новая'), ('in_progress', 'В работе'), ('done', 'Выполнена'), ('cancelled', 'Отменена')], max_length=20, verbose_name='Прежний статус')),
+                ('previous_assigned_to_id', models.BigIntegerField(blank=True, null=True, verbose_name='Прежний исполнитель')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='Версия инцидента')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Кто изменил')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['incident_id', 'id'], name='incident_event_history_idx')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
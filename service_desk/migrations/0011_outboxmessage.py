@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-17 19:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_desk', '0010_incidentevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('incident_id', models.BigIntegerField(verbose_name='Инцидент')),
+                ('recipient_id', models.BigIntegerField(verbose_name='Получатель')),
+                ('kind', models.CharField(choices=[('assigned', 'Назначен инцидент'), ('unassigned', 'Инцидент снят'), ('status', 'Изменён статус')], max_length=20, verbose_name='Событие')),
+                ('status', models.CharField(choices=[('new', 'Новая'), ('in_progress', 'В работе'), ('done', 'Выполнена'), ('cancelled', 'Отменена')], max_length=20, verbose_name='Статус инцидента')),
+                ('actor_id', models.BigIntegerField(blank=True, null=True, verbose_name='Кто изменил')),
+                ('state', models.CharField(choices=[('pending', 'Ожидает'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Доставка')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Доступно с')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Создано')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('state', 'pending')), fields=['available_at', 'id'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
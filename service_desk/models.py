@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Service(models.Model):
@@ -42,10 +43,40 @@ class Incident(models.Model):
         related_name='assigned_incidents'
     )
     created_at = models.DateTimeField("Создано", auto_now_add=True)
+    # Версия строки: растёт при каждом изменении (оптимистическая блокировка)
+    version = models.PositiveIntegerField("Версия", default=1)
+
+    class Meta:
+        indexes = [
+            # Список инцидентов: ORDER BY created_at DESC, id DESC (+ keyset)
+            models.Index(fields=["created_at", "id"], name="incident_created_idx"),
+            models.Index(fields=["status", "created_at", "id"], name="incident_status_idx"),
+            models.Index(fields=["service", "created_at", "id"], name="incident_service_idx"),
+            models.Index(fields=["assigned_to", "created_at", "id"], name="incident_assignee_idx"),
+            # Нагрузка техников: открытые инциденты по исполнителю
+            models.Index(fields=["assigned_to", "status"], name="incident_assignee_status_idx"),
+        ]
 
     def __str__(self):
         return f"Инцидент #{self.id} ({self.get_status_display()})"
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "version" not in update_fields:
+                kwargs["update_fields"] = [*update_fields, "version"]
+
+        # Сигналы post_save (счётчики статистики) выполняются в той же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # post_init при этом не вызывается — прежнее состояние для сигналов
+        # (signals.py) пусть перечитает pre_save
+        self._stat_bucket = None
+
 class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sent_messages")
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name="received_messages")
@@ -54,6 +85,211 @@ class Message(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # Переписка пары пользователей в порядке id (курсоры чата)
+            models.Index(fields=["sender", "receiver", "id"], name="message_pair_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.sender} → {self.receiver}: {self.text[:20]}"
+
+
+class Conversation(models.Model):
+    """
+    Сводка переписки пары пользователей для списка чатов.
+
+    Пара хранится упорядоченно (user_low.id <= user_high.id); поля *_low
+    и *_high относятся к соответствующему участнику. Поддерживается
+    service_desk/conversations.py при отправке и прочтении сообщений.
+    """
+
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+
+    last_message_id = models.BigIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_text = models.CharField(max_length=200, blank=True)
+    last_sender_id = models.BigIntegerField(null=True, blank=True)
+
+    # Непрочитанные сообщения и курсор прочтения (id) каждого участника
+    unread_low = models.PositiveIntegerField(default=0)
+    unread_high = models.PositiveIntegerField(default=0)
+    read_low_id = models.BigIntegerField(default=0)
+    read_high_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_low", "user_high"], name="conversation_pair_unique"),
+        ]
+        indexes = [
+            # Список чатов пользователя по свежести: id последнего сообщения растёт со временем
+            models.Index(fields=["user_low", "last_message_id"], name="conversation_low_idx"),
+            models.Index(fields=["user_high", "last_message_id"], name="conversation_high_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_low_id} ↔ {self.user_high_id}"
+
+
+class MessageArchiveSegment(models.Model):
+    """
+    Сжатый неизменяемый сегмент старых сообщений одной пары пользователей.
+
+    Сообщения переносятся сюда командой archive_messages и удаляются из
+    Message; история чата дочитывает их при прокрутке назад
+    (service_desk/archive.py).
+    """
+
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    first_message_id = models.BigIntegerField()
+    last_message_id = models.BigIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    message_count = models.PositiveIntegerField()
+    # zlib(JSON [[id, sender_id, created_at, text], ...]) в порядке id
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_low", "user_high", "last_message_id"], name="archive_pair_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_low_id} ↔ {self.user_high_id}: {self.first_message_id}…{self.last_message_id}"
+
+
+class IncidentStat(models.Model):
+    """
+    Счётчик инцидентов в разрезе (услуга, техник, статус).
+
+    Поддерживается инкрементально при создании, изменении и удалении
+    инцидентов (service_desk/stats.py), пересчитывается командой
+    rebuild_incident_stats.
+    """
+
+    UNASSIGNED = 0
+
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="+")
+    # id пользователя-техника, 0 — не назначено
+    technician_id = models.BigIntegerField("Техник", default=UNASSIGNED)
+    status = models.CharField("Статус", max_length=20, choices=Incident.STATUS_CHOICES)
+    count = models.IntegerField("Количество", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["service", "technician_id", "status"],
+                name="incident_stat_bucket_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.service_id}/{self.technician_id}/{self.status}: {self.count}"
+
+
+class ImportCheckpoint(models.Model):
+    """Позиция импорта: сколько строк файла уже обработано и закоммичено."""
+
+    name = models.CharField("Задание импорта", max_length=255, unique=True)
+    position = models.PositiveBigIntegerField("Обработано строк", default=0)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+
+class IncidentEvent(models.Model):
+    """
+    Журнал изменений инцидентов — только добавление (service_desk/events.py).
+
+    Каждое событие хранит состояние инцидента после изменения и прежние
+    значения статуса/исполнителя. id события — курсор ленты изменений.
+    """
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    KIND_CHOICES = [
+        (CREATED, "Создан"),
+        (UPDATED, "Изменён"),
+        (DELETED, "Удалён"),
+    ]
+
+    # Без внешних ключей: события удалённых инцидентов и пользователей остаются
+    incident_id = models.BigIntegerField("Инцидент")
+    kind = models.CharField("Событие", max_length=10, choices=KIND_CHOICES)
+    status = models.CharField("Статус", max_length=20, choices=Incident.STATUS_CHOICES)
+    assigned_to_id = models.BigIntegerField("Назначено", null=True, blank=True)
+    previous_status = models.CharField(
+        "Прежний статус", max_length=20, choices=Incident.STATUS_CHOICES, blank=True
+    )
+    previous_assigned_to_id = models.BigIntegerField("Прежний исполнитель", null=True, blank=True)
+    version = models.PositiveIntegerField("Версия инцидента", default=1)
+    actor = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="+", verbose_name="Кто изменил",
+    )
+    created_at = models.DateTimeField("Время", default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # История инцидента на странице инцидента
+            models.Index(fields=["incident_id", "id"], name="incident_event_history_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.incident_id} {self.kind} ({self.status})"
+
+
+class OutboxMessage(models.Model):
+    """
+    Уведомление техника об инциденте (transactional outbox, service_desk/outbox.py).
+
+    Пишется в той же транзакции, что и изменение инцидента, доставляется
+    командой deliver_notifications и после доставки удаляется; исчерпавшие
+    попытки остаются в состоянии failed. available_at — когда строку можно
+    забрать: сдвигается на время аренды при захвате и на паузу при повторе
+    после ошибки.
+    """
+
+    ASSIGNED = "assigned"
+    UNASSIGNED = "unassigned"
+    STATUS_CHANGED = "status"
+    KIND_CHOICES = [
+        (ASSIGNED, "Назначен инцидент"),
+        (UNASSIGNED, "Инцидент снят"),
+        (STATUS_CHANGED, "Изменён статус"),
+    ]
+
+    PENDING = "pending"
+    FAILED = "failed"
+    STATE_CHOICES = [
+        (PENDING, "Ожидает"),
+        (FAILED, "Ошибка"),
+    ]
+
+    # Без внешних ключей: строки пишутся и при удалении пользователя (signals.py)
+    incident_id = models.BigIntegerField("Инцидент")
+    recipient_id = models.BigIntegerField("Получатель")
+    kind = models.CharField("Событие", max_length=20, choices=KIND_CHOICES)
+    status = models.CharField("Статус инцидента", max_length=20, choices=Incident.STATUS_CHOICES)
+    actor_id = models.BigIntegerField("Кто изменил", null=True, blank=True)
+    state = models.CharField("Доставка", max_length=10, choices=STATE_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField("Попыток", default=0)
+    available_at = models.DateTimeField("Доступно с", default=timezone.now)
+    created_at = models.DateTimeField("Создано", default=timezone.now)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+
+    class Meta:
+        indexes = [
+            # Очередь воркера: только недоставленные, в порядке доступности
+            models.Index(
+                fields=["available_at", "id"], name="outbox_pending_idx",
+                condition=models.Q(state="pending"),
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.sender} → {self.receiver}: {self.text[:20]}"
\ No newline at end of file
+        return f"#{self.incident_id} → {self.recipient_id}: {self.kind} ({self.state})"
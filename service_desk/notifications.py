@@ -0,0 +1,62 @@
+# service_desk/notifications.py
+
+"""
+Отправители уведомлений для outbox (outbox.py).
+
+Отправитель выбирается в settings:
+
+    NOTIFICATION_SENDER = "service_desk.notifications.FileSender"
+    NOTIFICATION_SENDER_OPTIONS = {"path": BASE_DIR / "notifications.jsonl"}
+
+Отправитель — класс с методом send(notification); исключение из send()
+означает неудачу, строки уйдут на повтор. Свой канал (почта, мессенджер)
+подключается так же: подкласс BaseSender и путь к нему в настройке.
+"""
+
+import abc
+import json
+import sys
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseSender(abc.ABC):
+    def __init__(self, **options):
+        self.options = options
+
+    @abc.abstractmethod
+    def send(self, notification):
+        """Отправляет одно уведомление; исключение — строки уйдут на повтор."""
+
+
+class ConsoleSender(BaseSender):
+    """Пишет текст уведомления в stdout (или в переданный stream)."""
+
+    def __init__(self, stream=None, **options):
+        super().__init__(**options)
+        self.stream = stream or sys.stdout
+
+    def send(self, notification):
+        self.stream.write(f"[{notification.recipient.username}] {notification.text}\n")
+        self.stream.flush()
+
+
+class FileSender(BaseSender):
+    """Дописывает уведомления в файл, по строке JSON на каждое."""
+
+    def __init__(self, path, **options):
+        super().__init__(**options)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, notification):
+        line = json.dumps(notification.as_dict(), ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def get_sender():
+    sender_class = import_string(settings.NOTIFICATION_SENDER)
+    return sender_class(**getattr(settings, "NOTIFICATION_SENDER_OPTIONS", {}))
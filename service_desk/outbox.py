@@ -0,0 +1,212 @@
+# service_desk/outbox.py
+
+"""
+Уведомления техников через transactional outbox.
+
+enqueue() вызывается из events.py для каждого записанного события
+инцидента, то есть в той же транзакции, что и само изменение: откат
+изменения откатывает и уведомление, а запрос не ждёт доставки — он
+только добавляет строки OutboxMessage.
+
+Кому и что:
+- назначили инцидент — новому исполнителю (assigned);
+- сняли назначение — прежнему исполнителю (unassigned);
+- сменился статус — текущему исполнителю (status).
+Тот, кто сам сделал изменение, уведомления не получает.
+
+Доставка — команда deliver_notifications:
+- claim() забирает пачку готовых строк и сдвигает их available_at на
+  время аренды: упавший воркер не теряет строки, они вернутся в очередь;
+- deliver() склеивает строки одного инцидента для одного получателя в
+  одно уведомление с последним состоянием и отправляет его через
+  отправитель из NOTIFICATION_SENDER (notifications.py);
+- доставленные строки удаляются, после ошибки — повтор с экспоненциальной
+  паузой, после OUTBOX_MAX_ATTEMPTS попыток — состояние failed.
+"""
+
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .db import retry_on_lock
+from .models import Incident, IncidentEvent, OutboxMessage
+
+OUTBOX_BATCH_SIZE = 100
+# Сколько строка остаётся за воркером, прежде чем её сможет забрать другой
+OUTBOX_LEASE = timedelta(minutes=5)
+OUTBOX_MAX_RETRY_DELAY = 60 * 60
+
+STATUS_LABELS = dict(Incident.STATUS_CHOICES)
+KIND_LABELS = dict(OutboxMessage.KIND_CHOICES)
+
+
+def _messages_for(event):
+    if event.kind == IncidentEvent.DELETED:
+        return
+
+    previous = event.previous_assigned_to_id
+    current = event.assigned_to_id
+    fields = {"incident_id": event.incident_id, "status": event.status, "actor_id": event.actor_id}
+
+    if event.kind == IncidentEvent.CREATED:
+        if current:
+            yield OutboxMessage(recipient_id=current, kind=OutboxMessage.ASSIGNED, **fields)
+        return
+
+    if current != previous:
+        if current:
+            yield OutboxMessage(recipient_id=current, kind=OutboxMessage.ASSIGNED, **fields)
+        if previous:
+            yield OutboxMessage(recipient_id=previous, kind=OutboxMessage.UNASSIGNED, **fields)
+    elif current and event.status != event.previous_status:
+        yield OutboxMessage(recipient_id=current, kind=OutboxMessage.STATUS_CHANGED, **fields)
+
+
+def enqueue(events):
+    """Строки outbox для только что записанных событий журнала."""
+    messages = [
+        message
+        for event in events
+        for message in _messages_for(event)
+        if message.recipient_id != message.actor_id
+    ]
+    if messages:
+        OutboxMessage.objects.bulk_create(messages, batch_size=OUTBOX_BATCH_SIZE)
+
+
+# ----------------------------- ДОСТАВКА ---------------------------
+
+class Notification:
+    """Одно уведомление получателю: склеенные строки outbox по инциденту."""
+
+    def __init__(self, recipient, incident_id, kinds, status, service, actor, count):
+        self.recipient = recipient
+        self.incident_id = incident_id
+        self.kinds = kinds
+        self.status = status
+        self.service = service
+        self.actor = actor
+        self.count = count
+
+    @property
+    def text(self):
+        events = ", ".join(KIND_LABELS[kind].lower() for kind in self.kinds)
+        text = f"Инцидент #{self.incident_id}"
+        if self.service:
+            text += f" ({self.service})"
+        text += f": {events}. Статус: {STATUS_LABELS.get(self.status, self.status)}."
+        if self.actor:
+            text += f" Изменил: {self.actor}."
+        return text
+
+    def as_dict(self):
+        return {
+            "recipient": self.recipient.username,
+            "recipient_email": self.recipient.email,
+            "incident_id": self.incident_id,
+            "kinds": self.kinds,
+            "status": self.status,
+            "service": self.service,
+            "actor": self.actor,
+            "events": self.count,
+            "text": self.text,
+        }
+
+
+@retry_on_lock
+def claim(batch_size=OUTBOX_BATCH_SIZE, lease=OUTBOX_LEASE):
+    """Забирает до batch_size готовых строк на время lease."""
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(state=OutboxMessage.PENDING, available_at__lte=now)
+            .order_by("available_at", "id")[:batch_size]
+        )
+        if messages:
+            OutboxMessage.objects.filter(id__in=[m.id for m in messages]).update(
+                available_at=now + lease, attempts=F("attempts") + 1
+            )
+    for message in messages:
+        message.attempts += 1
+    return messages
+
+
+def _coalesce(messages):
+    """{(инцидент, получатель): строки по возрастанию id}."""
+    groups = defaultdict(list)
+    for message in sorted(messages, key=lambda m: m.id):
+        groups[message.incident_id, message.recipient_id].append(message)
+    return groups
+
+
+def _notifications(groups):
+    user_ids = {recipient_id for _, recipient_id in groups}
+    user_ids |= {m.actor_id for group in groups.values() for m in group if m.actor_id}
+    users = User.objects.in_bulk(user_ids)
+    services = dict(
+        Incident.objects.filter(id__in={incident_id for incident_id, _ in groups})
+        .values_list("id", "service__name")
+    )
+
+    for (incident_id, recipient_id), group in groups.items():
+        recipient = users.get(recipient_id)
+        if recipient is None:
+            # Получатель удалён — доставлять некому
+            yield group, None
+            continue
+        last = group[-1]
+        actor = users.get(last.actor_id)
+        yield group, Notification(
+            recipient=recipient,
+            incident_id=incident_id,
+            kinds=list(dict.fromkeys(m.kind for m in group)),
+            status=last.status,
+            service=services.get(incident_id),
+            actor=actor.username if actor else None,
+            count=len(group),
+        )
+
+
+def retry_delay(attempts):
+    """Пауза перед повтором (сек): экспонента от базы с разбросом, не больше часа."""
+    delay = settings.OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1)
+    return min(delay, OUTBOX_MAX_RETRY_DELAY) * random.uniform(0.5, 1.0)
+
+
+@retry_on_lock
+def _finish(delivered, failed):
+    with transaction.atomic():
+        if delivered:
+            OutboxMessage.objects.filter(id__in=delivered).delete()
+        now = timezone.now()
+        for message, error in failed:
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                changes = {"state": OutboxMessage.FAILED}
+            else:
+                changes = {"available_at": now + timedelta(seconds=retry_delay(message.attempts))}
+            OutboxMessage.objects.filter(id=message.id).update(last_error=error, **changes)
+
+
+def deliver(messages, sender):
+    """Отправляет захваченные строки; возвращает (доставлено уведомлений, ошибок)."""
+    delivered, failed = [], []
+    sent = errors = 0
+    for group, notification in _notifications(_coalesce(messages)):
+        if notification is not None:
+            try:
+                sender.send(notification)
+            except Exception as exc:
+                errors += 1
+                failed.extend((message, f"{type(exc).__name__}: {exc}") for message in group)
+                continue
+            sent += 1
+        delivered.extend(message.id for message in group)
+    _finish(delivered, failed)
+    return sent, errors
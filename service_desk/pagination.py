@@ -0,0 +1,123 @@
+# service_desk/pagination.py
+
+"""
+Keyset-пагинация по (created_at, id) — стоимость страницы не зависит
+от её номера и размера таблицы, в отличие от OFFSET.
+
+Курсор — строка "<микросекунды created_at>-<id>" последней (или первой)
+строки страницы.
+
+EstimatedCountPaginator — для админки, где нужны номера страниц: вместо
+полного COUNT(*) — оценка числа строк.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(obj):
+    """Курсор модели или строки values() (с ключами created_at и id)."""
+    if isinstance(obj, dict):
+        created_at, pk = obj["created_at"], obj["id"]
+    else:
+        created_at, pk = obj.created_at, obj.pk
+    delta = created_at - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+    return f"{micros}-{pk}"
+
+
+def decode_cursor(value):
+    """Возвращает (created_at, id) или None для некорректного курсора."""
+    try:
+        micros, pk = value.split("-", 1)
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def paginate_keyset(queryset, page_size, after=None, before=None):
+    """
+    Страница queryset в порядке (-created_at, -id).
+
+    after  — курсор: строки старше него (следующая страница);
+    before — курсор: строки новее него (предыдущая страница).
+    """
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+
+    if before:
+        created_at, pk = before
+        rows = list(
+            queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by("created_at", "id")[:page_size + 1]
+        )
+        has_extra = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1]) if rows else None,
+            prev_cursor=encode_cursor(rows[0]) if rows and has_extra else None,
+        )
+
+    if after:
+        created_at, pk = after
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    rows = list(queryset.order_by("-created_at", "-id")[:page_size + 1])
+    has_extra = len(rows) > page_size
+    rows = rows[:page_size]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1]) if rows and has_extra else None,
+        prev_cursor=encode_cursor(rows[0]) if rows and after else None,
+    )
+
+
+# Точный COUNT отфильтрованной выборки — не дальше этого числа строк
+ESTIMATED_COUNT_LIMIT = 10_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Число строк без полного COUNT(*):
+    - без фильтров — по диапазону первичного ключа, MAX(id) - MIN(id) + 1:
+      два поиска по индексу; удалённые строки завышают оценку;
+    - с фильтрами — COUNT не более чем по ESTIMATED_COUNT_LIMIT строкам,
+      дальше считаем, что строк ровно столько.
+    Из-за оценки последние страницы могут оказаться пустыми.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        pk = queryset.model._meta.pk
+        if queryset.query.where or pk.get_internal_type() not in ("AutoField", "BigAutoField"):
+            return queryset.order_by()[:ESTIMATED_COUNT_LIMIT].count()
+
+        # Отдельные запросы: MIN и MAX в одном SQLite считает полным сканом
+        ids = queryset.order_by().values_list(pk.attname, flat=True)
+        last = ids.order_by(f"-{pk.attname}").first()
+        if last is None:
+            return 0
+        return last - ids.order_by(pk.attname).first() + 1
@@ -0,0 +1,62 @@
+# service_desk/pubsub.py
+
+"""
+Внутрипроцессный pub/sub для доставки сообщений чата.
+
+Подписчик — корутина long-poll запроса (ASGI), ждущая новых сообщений
+в переписке (user_id, other_id). Публикация может прийти из другого
+потока или event loop (синхронный код, другой ASGI-запрос), поэтому
+будить подписчиков нужно потокобезопасно через их event loop.
+
+Работает в пределах одного процесса: подписчики других воркеров
+получат сообщение по таймауту ожидания.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+
+class ChatBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id, other_id):
+        """Подписка на переписку user_id ↔ other_id со стороны user_id."""
+        key = (user_id, other_id)
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+
+        with self._lock:
+            self._subscribers[key].add(waiter)
+        try:
+            yield waiter[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(key)
+                if subscribers is not None:
+                    subscribers.discard(waiter)
+                    if not subscribers:
+                        del self._subscribers[key]
+
+    def publish(self, sender_id, receiver_id):
+        """Будит все вкладки обоих участников переписки."""
+        with self._lock:
+            waiters = list(self._subscribers.get((receiver_id, sender_id), ()))
+            waiters += self._subscribers.get((sender_id, receiver_id), ())
+
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # event loop подписчика уже закрыт
+                pass
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+
+broker = ChatBroker()
@@ -0,0 +1,83 @@
+# service_desk/roles.py
+
+"""
+Роли пользователя: админ, техник, сотрудник.
+
+Группы пользователя считываются из БД один раз и кешируются:
+- на объекте user — в пределах запроса;
+- в кеше Django — между запросами (он общий для воркеров, см. cache.py).
+
+Кеш сбрасывается сигналами при изменении состава групп пользователя,
+переименовании или удалении группы (см. signals.py).
+"""
+
+import time
+
+from django.core.cache import cache
+
+TECH_GROUP = "Tech"
+
+ROLES_CACHE_TIMEOUT = 60 * 60
+ROLES_VERSION_KEY = "roles:version"
+
+
+class UserRoles:
+    def __init__(self, user, groups):
+        self.groups = frozenset(groups)
+        self.is_authenticated = user.is_authenticated
+        self.is_admin = user.is_superuser or user.is_staff
+        self.is_tech = TECH_GROUP in self.groups
+
+    @property
+    def can_view_incidents(self):
+        """Админ и техник видят все инциденты."""
+        return self.is_admin or self.is_tech
+
+    @property
+    def can_assign(self):
+        return self.is_admin
+
+    @property
+    def can_edit_services(self):
+        """Услуги редактируют админы и сотрудники, но не техники."""
+        return self.is_admin or not self.is_tech
+
+
+def _cache_key(user_id):
+    # Версия по времени: если ключ версии вытеснен, старые записи не оживут
+    version = cache.get_or_set(ROLES_VERSION_KEY, time.time_ns, None)
+    return f"roles:{version}:{user_id}"
+
+
+def _load_groups(user):
+    if not user.is_authenticated:
+        return ()
+
+    key = _cache_key(user.pk)
+    groups = cache.get(key)
+    if groups is None:
+        groups = list(user.groups.values_list("name", flat=True))
+        cache.set(key, groups, ROLES_CACHE_TIMEOUT)
+    return groups
+
+
+def get_roles(user):
+    """Роли пользователя; повторные вызовы в запросе не ходят даже в кеш."""
+    roles = getattr(user, "_service_desk_roles", None)
+    if roles is None:
+        roles = UserRoles(user, _load_groups(user))
+        if user.is_authenticated:
+            user._service_desk_roles = roles
+    return roles
+
+
+def invalidate_user_roles(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def invalidate_all_roles():
+    """Сбрасывает кеш ролей всех пользователей сменой версии ключей."""
+    try:
+        cache.incr(ROLES_VERSION_KEY)
+    except ValueError:
+        cache.set(ROLES_VERSION_KEY, time.time_ns(), None)
@@ -0,0 +1,112 @@
+# service_desk/search.py
+
+"""
+Полнотекстовый поиск по инцидентам (SQLite FTS5).
+
+Индекс service_desk_incident_fts(comment, service_name) создаётся
+миграцией 0006 и поддерживается триггерами БД при вставке, изменении и
+удалении инцидентов, а также при переименовании услуги — в том числе
+для bulk_create/update(), которые обходят сигналы Django.
+
+На других СУБД поиск откатывается к icontains.
+"""
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+FTS_TABLE = "service_desk_incident_fts"
+
+# Маркеры подсветки в snippet(): заменяются на <mark> после экранирования
+_HL_START, _HL_END = "\x02", "\x03"
+
+
+def fts_available():
+    return connection.vendor == "sqlite"
+
+
+def fts_query(text):
+    """Пользовательский ввод → запрос FTS5: все слова, последнее — префикс."""
+    terms = ['"%s"' % term.replace('"', '""') for term in text.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_incidents(queryset, text):
+    """
+    Инциденты queryset, подходящие под text, по убыванию релевантности.
+    Фрагменты с подсветкой для страницы — attach_snippets().
+    """
+    query = fts_query(text)
+    if not query:
+        return queryset.none()
+
+    if not fts_available():
+        return queryset.filter(
+            Q(comment__icontains=text) | Q(service__name__icontains=text)
+        )
+
+    # rank есть только у строк FTS из запроса с MATCH. Подзапрос по rowid на
+    # каждый инцидент заново читал бы весь индекс по словам запроса, поэтому
+    # совпадения материализуются один раз (SQLite 3.35+) и ищутся по
+    # автоматическому индексу на id
+    rank = RawSQL(
+        f"WITH fts AS MATERIALIZED (SELECT rowid AS id, rank FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s) "
+        f"SELECT rank FROM fts WHERE fts.id = {_outer_id(queryset)}",
+        [query],
+    )
+    return filter_matching(queryset, text).annotate(search_rank=rank).order_by("search_rank")
+
+
+def _outer_id(queryset):
+    """Первичный ключ внешнего запроса для коррелированного подзапроса."""
+    quote = connection.ops.quote_name
+    return f"{quote(queryset.model._meta.db_table)}.{quote(queryset.model._meta.pk.column)}"
+
+
+def attach_snippets(incidents, text):
+    """
+    Атрибут search_snippet — фрагмент комментария с подсветкой (безопасный
+    HTML) — для уже выбранной страницы: snippet() по всем совпадениям
+    обходился бы на порядок дороже самого поиска.
+    """
+    query = fts_query(text)
+    ids = [incident.pk for incident in incidents]
+    snippets = {}
+    if query and ids and fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, snippet({FTS_TABLE}, 0, '{_HL_START}', '{_HL_END}', '…', 16) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"AND rowid IN ({', '.join(['%s'] * len(ids))})",
+                [query, *ids],
+            )
+            snippets = dict(cursor.fetchall())
+    for incident in incidents:
+        incident.search_snippet = highlight(snippets.get(incident.pk))
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet or "")
+        .replace(_HL_START, "<mark>")
+        .replace(_HL_END, "</mark>")
+    )
+
+
+def filter_matching(queryset, text):
+    """Только фильтр по совпадению, без ранжирования (выгрузка, админка)."""
+    query = fts_query(text)
+    if not query:
+        return queryset
+    if not fts_available():
+        return queryset.filter(
+            Q(comment__icontains=text) | Q(service__name__icontains=text)
+        )
+    return queryset.filter(id__in=RawSQL(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query]
+    ))
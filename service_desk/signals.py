@@ -0,0 +1,154 @@
+# service_desk/signals.py
+
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from . import events, metrics, stats
+from .assignment import engine as assignment_engine
+from .catalog import invalidate_catalog
+from .models import Incident, IncidentStat, Service
+from .roles import invalidate_all_roles, invalidate_user_roles
+
+
+# ----------------------------- РОЛИ -------------------------------
+
+# Кеш сбрасываем после коммита: сброс внутри транзакции другой запрос
+# тут же заполнил бы снова — прежними группами из ещё не изменённой БД
+
+def _roles_changed(user_ids):
+    if user_ids is None:
+        invalidate_all_roles()
+    else:
+        for user_id in user_ids:
+            invalidate_user_roles(user_id)
+    # Состав техников изменился — куча автоназначения строится заново
+    assignment_engine.invalidate()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        # user.groups.add(...) / remove / clear
+        user_ids = [instance.pk]
+    elif pk_set:
+        # group.user_set.add(...) / remove
+        user_ids = list(pk_set)
+    else:
+        # group.user_set.clear() — затронутых пользователей не знаем
+        user_ids = None
+    transaction.on_commit(lambda: _roles_changed(user_ids))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    transaction.on_commit(lambda: _roles_changed(None))
+
+
+# ---------------------------- КАТАЛОГ -----------------------------
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def service_changed(sender, **kwargs):
+    invalidate_catalog()
+
+
+# --------------------------- СТАТИСТИКА ---------------------------
+
+@receiver(post_init, sender=Incident)
+def incident_loaded(sender, instance, **kwargs):
+    # Корзина на момент загрузки — чтобы при сохранении знать, откуда ушли
+    instance._stat_bucket = stats.incident_bucket(instance) if instance.pk else None
+    instance._logged_state = _state(instance._stat_bucket) if instance._stat_bucket else None
+
+
+@receiver(pre_save, sender=Incident)
+def incident_before_save(sender, instance, **kwargs):
+    if not instance._state.adding and instance._stat_bucket is None:
+        # Загружен с отложенными полями — берём прежние значения из БД
+        old = Incident.objects.filter(pk=instance.pk).values_list(
+            "service_id", "assigned_to_id", "status"
+        ).first()
+        instance._stat_bucket = stats.bucket_of(*old) if old else None
+        instance._logged_state = _state(instance._stat_bucket) if old else None
+
+
+@receiver(post_save, sender=Incident)
+def incident_saved(sender, instance, created, **kwargs):
+    old = None if created else instance._stat_bucket
+    new = stats.bucket_of(instance.service_id, instance.assigned_to_id, instance.status)
+    stats.record_move(old, new)
+    instance._stat_bucket = new
+
+    # Нагрузка техников для автоназначения — только после коммита
+    if old != new and not getattr(instance, "_auto_assigned", False):
+        transaction.on_commit(lambda: assignment_engine.incident_moved(old, new))
+    instance._auto_assigned = False
+
+
+@receiver(post_delete, sender=Incident)
+def incident_deleted(sender, instance, **kwargs):
+    old = stats.incident_bucket(instance)
+    stats.record_move(old, None)
+    transaction.on_commit(lambda: assignment_engine.incident_moved(old, None))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    stats.unassign_technician(instance.pk)
+
+
+# ---------------------------- ЖУРНАЛ -----------------------------
+
+def _state(bucket):
+    """(статус, исполнитель) из корзины статистики."""
+    _, technician_id, status = bucket
+    return status, technician_id if technician_id != IncidentStat.UNASSIGNED else None
+
+
+@receiver(post_save, sender=Incident)
+def incident_logged(sender, instance, created, **kwargs):
+    # Прежние статус и исполнитель запомнены в post_init / pre_save
+    actor_id = getattr(instance, "_event_actor_id", None)
+    new = (instance.status, instance.assigned_to_id)
+    if created:
+        events.record_created([instance], actor_id)
+    elif instance._logged_state is not None and instance._logged_state != new:
+        events.record_changes(
+            [(instance.pk, instance.version, instance._logged_state, new)], actor_id
+        )
+    instance._logged_state = new
+
+
+@receiver(post_delete, sender=Incident)
+def incident_delete_logged(sender, instance, **kwargs):
+    events.record_deleted(instance, getattr(instance, "_event_actor_id", None))
+
+
+@receiver(pre_delete, sender=User)
+def technician_removed(sender, instance, **kwargs):
+    # Инциденты удаляемого пользователя станут неназначенными (SET_NULL
+    # обходит сигналы) — фиксируем это в журнале и поднимаем версии
+    assigned = Incident.objects.filter(assigned_to_id=instance.pk)
+    rows = list(assigned.values_list("id", "version", "status"))
+    if not rows:
+        return
+    assigned.update(version=F("version") + 1)
+    events.record_changes(
+        (pk, version + 1, (status, instance.pk), (status, None))
+        for pk, version, status in rows
+    )
+
+
+# ----------------------------- МЕТРИКИ ----------------------------
+
+connection_created.connect(metrics.install_query_counter)
@@ -0,0 +1,132 @@
+# service_desk/stats.py
+
+"""
+Инкрементальная статистика инцидентов для ITSM-панели.
+
+Каждый инцидент попадает ровно в одну «корзину» (услуга, техник, статус)
+таблицы IncidentStat. При создании, смене статуса/исполнителя и удалении
+счётчики корзин сдвигаются на ±1 в той же транзакции, поэтому панель
+читает O(число корзин) строк вместо COUNT/GROUP BY по всем инцидентам.
+"""
+
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Incident, IncidentStat
+
+STATUS_LABELS = dict(Incident.STATUS_CHOICES)
+
+
+def bucket_of(service_id, assigned_to_id, status):
+    return (service_id, assigned_to_id or IncidentStat.UNASSIGNED, status)
+
+
+def incident_bucket(incident):
+    """Корзина по загруженным полям; None, если какие-то поля отложены."""
+    values = incident.__dict__
+    if not all(name in values for name in ("service_id", "assigned_to_id", "status")):
+        return None
+    return bucket_of(values["service_id"], values["assigned_to_id"], values["status"])
+
+
+def apply_deltas(deltas):
+    """Применяет {корзина: изменение} к счётчикам."""
+    with transaction.atomic():
+        for (service_id, technician_id, status), delta in deltas.items():
+            if not delta:
+                continue
+            updated = IncidentStat.objects.filter(
+                service_id=service_id, technician_id=technician_id, status=status
+            ).update(count=F("count") + delta)
+            # Нет строки при уменьшении — корзину уже удалило каскадом вместе с услугой
+            if not updated and delta > 0:
+                IncidentStat.objects.create(
+                    service_id=service_id, technician_id=technician_id,
+                    status=status, count=delta,
+                )
+
+
+def record_move(old, new):
+    """Инцидент перешёл из корзины old в new (None — не существовал)."""
+    if old == new:
+        return
+    deltas = Counter()
+    if old is not None:
+        deltas[old] -= 1
+    if new is not None:
+        deltas[new] += 1
+    apply_deltas(deltas)
+
+
+def unassign_technician(user_id):
+    """Пользователь удалён: его инциденты стали неназначенными (SET_NULL)."""
+    with transaction.atomic():
+        rows = list(IncidentStat.objects.filter(technician_id=user_id))
+        deltas = Counter()
+        for row in rows:
+            deltas[bucket_of(row.service_id, None, row.status)] += row.count
+        IncidentStat.objects.filter(technician_id=user_id).delete()
+        apply_deltas(deltas)
+
+
+def rebuild():
+    """Полный пересчёт счётчиков по таблице инцидентов."""
+    rows = (
+        Incident.objects.order_by()
+        .values("service_id", "assigned_to_id", "status")
+        .annotate(n=Count("id"))
+    )
+    with transaction.atomic():
+        IncidentStat.objects.all().delete()
+        IncidentStat.objects.bulk_create([
+            IncidentStat(
+                service_id=row["service_id"],
+                technician_id=row["assigned_to_id"] or IncidentStat.UNASSIGNED,
+                status=row["status"],
+                count=row["n"],
+            )
+            for row in rows
+        ])
+
+
+def dashboard_stats():
+    """Счётчики по услугам и по техникам для панели."""
+    rows = IncidentStat.objects.filter(count__gt=0).select_related("service")
+
+    by_service = {}
+    by_technician = {}
+    for row in rows:
+        service = by_service.setdefault(row.service_id, {
+            "name": row.service.name, "counts": Counter(),
+        })
+        service["counts"][row.status] += row.count
+
+        technician = by_technician.setdefault(row.technician_id, {
+            "name": None, "counts": Counter(),
+        })
+        technician["counts"][row.status] += row.count
+
+    names = dict(
+        User.objects.filter(id__in=by_technician).values_list("id", "username")
+    )
+    for technician_id, technician in by_technician.items():
+        technician["name"] = names.get(technician_id, "Не назначено")
+
+    def table(groups):
+        return [
+            {
+                "name": group["name"],
+                "counts": [group["counts"][status] for status in STATUS_LABELS],
+                "total": sum(group["counts"].values()),
+            }
+            for group in sorted(groups.values(), key=lambda g: g["name"])
+        ]
+
+    return {
+        "statuses": list(STATUS_LABELS.values()),
+        "by_service": table(by_service),
+        "by_technician": table(by_technician),
+    }
@@ -0,0 +1,999 @@
+# service_desk/tests.py
+
+"""
+Тесты service_desk:
+
+    python manage.py test service_desk
+
+Кеш в тестах — LocMemCache: общий файловый кеш из settings хранит роли
+и корзины ограничения частоты между запусками и процессами. Статика —
+без манифеста: тесты не требуют collectstatic.
+"""
+
+import asyncio
+import gzip
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import assets, export, fragments, metrics, outbox, roles, search, throttle, views
+from .assignment import _open_loads, engine as assignment_engine
+from .conversations import mark_read, ordered_pair, send_message
+from .models import (
+    Conversation, Incident, IncidentEvent, Message, MessageArchiveSegment, OutboxMessage,
+    Service,
+)
+from .notifications import BaseSender, FileSender
+from .pagination import ESTIMATED_COUNT_LIMIT, EstimatedCountPaginator, encode_cursor
+from .pubsub import broker
+from .roles import TECH_GROUP
+
+test_settings = override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "fragments": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                      "LOCATION": "fragments"},
+    },
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+
+
+async def _wait_for_subscribers(count, timeout=5):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while broker.subscriber_count() < count:
+        if loop.time() > deadline:
+            raise AssertionError(f"подписчиков {broker.subscriber_count()}, ожидалось {count}")
+        await asyncio.sleep(0.01)
+
+
+# ----------------------------- СТАТИКА -----------------------------
+
+class StaticServeTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        css = b"body { color: black; }\n" * 100
+        with open(f"{root.name}/style.css", "wb") as f:
+            f.write(css)
+        with open(f"{root.name}/style.css.gz", "wb") as f:
+            f.write(gzip.compress(css))
+        settings = override_settings(STATIC_ROOT=root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.factory = RequestFactory()
+
+    def test_compressed_variant_by_accept_encoding(self):
+        request = self.factory.get("/static/style.css", headers={"accept-encoding": "gzip, br"})
+        response = assets.serve(request, "style.css")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_compressed_variant_by_name_is_not_found(self):
+        request = self.factory.get("/static/style.css.gz")
+        with self.assertRaises(Http404):
+            assets.serve(request, "style.css.gz")
+
+
+# ----------------------------- СПИСОК ИНЦИДЕНТОВ -----------------------------
+
+@test_settings
+class IncidentsListQueriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", password=None)
+        techs = Group.objects.create(name=TECH_GROUP)
+        cls.techs = [User.objects.create_user(f"tech{i}") for i in range(5)]
+        techs.user_set.add(*cls.techs)
+        cls.services = [Service.objects.create(name=f"Услуга {i}", price=100) for i in range(5)]
+
+    def add_incidents(self, count):
+        Incident.objects.bulk_create(
+            Incident(
+                service=self.services[i % len(self.services)],
+                assigned_to=self.techs[i % len(self.techs)] if i % 3 else None,
+                created_by=self.admin,
+                comment=f"инцидент {i}",
+            )
+            for i in range(count)
+        )
+
+    def get_list(self, **params):
+        # Без кеша фрагментов и ролей: считаем запросы холодного рендера
+        cache.clear()
+        caches["fragments"].clear()
+        response = self.client.get(reverse("service_desk:incidents_list"), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_grow_with_table(self):
+        self.client.force_login(self.admin)
+        self.add_incidents(3)
+        with CaptureQueriesContext(connection) as small:
+            self.get_list()
+
+        # Больше страницы, у строк разные услуги и исполнители
+        self.add_incidents(200)
+        with self.assertNumQueries(len(small)):
+            response = self.get_list()
+        self.assertEqual(len(response.context["page"].items), views.INCIDENTS_PAGE_SIZE)
+
+        with self.assertNumQueries(len(small)):
+            self.get_list(after=response.context["page"].next_cursor)
+
+
+    def test_rows_are_cached_outside_default_cache(self):
+        self.client.force_login(self.admin)
+        self.add_incidents(1)
+        self.get_list()
+        incident = Incident.objects.select_related("service", "assigned_to").get()
+        key = fragments._incident_key("row", incident)
+        self.assertIsNotNone(caches["fragments"].get(key))
+        self.assertIsNone(cache.get(key))
+
+
+# ----------------------------- ПОИСК -----------------------------
+
+@test_settings
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", password=None)
+        service = Service.objects.create(name="Печать", price=100)
+        cls.weak, cls.strong, cls.other = (
+            Incident.objects.create(service=service, comment=comment)
+            for comment in (
+                "не работает принтер, а ещё сломался ноутбук и монитор мерцает",
+                "принтер замял бумагу, принтер не печатает",
+                "нет интернета",
+            )
+        )
+
+    def test_results_by_relevance(self):
+        found = search.search_incidents(Incident.objects.all(), "принт")
+        self.assertEqual(list(found), [self.strong, self.weak])
+
+    def test_page_snippets_are_highlighted(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("service_desk:incidents_list"), {"q": "принтер"})
+        [first, second] = response.context["page"]["items"]
+        self.assertEqual(first, self.strong)
+        self.assertIn("<mark>принтер</mark> замял", first.search_snippet)
+        self.assertIn("<mark>принтер</mark>", second.search_snippet)
+
+
+# ----------------------------- ПЛАНЫ ЗАПРОСОВ -----------------------------
+
+# Таблицы, которые растут с нагрузкой: полный скан по ним недопустим
+HOT_TABLES = {
+    model._meta.db_table
+    for model in (Incident, Message, Conversation, IncidentEvent, MessageArchiveSegment)
+}
+# "SCAN <table>" без "USING ... INDEX" — полный проход по таблице
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+@test_settings
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN QUERY PLAN для SQL, который выполняют сами представления:
+    запросы снимаются CaptureQueriesContext, а не копируются в тест.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", password=None)
+        cls.bob = User.objects.create_user("bob")
+        cls.tech = User.objects.create_user("tech")
+        Group.objects.create(name=TECH_GROUP).user_set.add(cls.tech)
+        cls.service = Service.objects.create(name="Печать", price=100)
+        for i in range(5):
+            Incident.objects.create(
+                service=cls.service, comment=f"принтер сломался {i}",
+                assigned_to=cls.tech if i % 2 else None,
+            )
+        for i in range(5):
+            send_message(cls.admin, cls.bob, f"сообщение {i}")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def plans(self, name, *args, **params):
+        """[(sql, [строки плана])] для SELECT-запросов представления."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f"service_desk:{name}", args=args), params)
+        self.assertEqual(response.status_code, 200)
+        result = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if query["sql"].startswith("SELECT"):
+                    cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                    result.append((query["sql"], [row[3] for row in cursor.fetchall()]))
+        return result
+
+    def assertNoFullScan(self, name, *args, **params):
+        plans = self.plans(name, *args, **params)
+        for sql, plan in plans:
+            scans = [m[1] for m in map(FULL_SCAN.match, plan) if m and m[1] in HOT_TABLES]
+            self.assertFalse(scans, f"{name} {params}: полный скан {scans}\n{sql}\n{plan}")
+        return plans
+
+    def assertSortedByIndex(self, plans, table):
+        """Запросы к table идут в порядке индекса: LIMIT останавливает чтение."""
+        for sql, plan in plans:
+            if f'FROM "{table}"' in sql:
+                self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan, f"{sql}\n{plan}")
+
+    def test_incidents_list(self):
+        oldest = Incident.objects.earliest("created_at")
+        for params in (
+            {}, {"after": encode_cursor(oldest)}, {"before": encode_cursor(oldest)},
+            {"status": "new"}, {"service": self.service.pk},
+            {"assigned_to": self.tech.pk}, {"assigned_to": "none"},
+        ):
+            with self.subTest(**params):
+                plans = self.assertNoFullScan("incidents_list", **params)
+                # Поэтому индексы (service, created_at, id) и (assigned_to, created_at, id):
+                # по одностолбцовым индексам внешних ключей SQLite нашёл бы строки,
+                # но сортировал бы все инциденты услуги/техника ради одной страницы
+                self.assertSortedByIndex(plans, Incident._meta.db_table)
+
+    def test_api_incidents(self):
+        for params in (
+            {}, {"status": "new", "service": self.service.pk}, {"assigned_to": self.tech.pk},
+        ):
+            with self.subTest(**params):
+                plans = self.assertNoFullScan("api_incidents", **params)
+                self.assertSortedByIndex(plans, Incident._meta.db_table)
+
+    def test_search(self):
+        # Совпадения ищет индекс FTS, инциденты берутся по первичному ключу
+        self.assertNoFullScan("incidents_list", q="принтер")
+        self.assertNoFullScan("api_incidents", q="принтер")
+
+    def test_incident_changes(self):
+        self.assertNoFullScan("api_incident_changes", since=0)
+        self.assertNoFullScan("api_incident_changes")
+
+    def test_chat(self):
+        last_id = Message.objects.latest("id").id
+        self.assertNoFullScan("chat_list")
+        for params in ({}, {"before_id": last_id}, {"since_id": last_id - 2}):
+            with self.subTest(**params):
+                self.assertNoFullScan("api_get_messages", self.bob.pk, **params)
+
+
+# ----------------------------- АДМИНКА -----------------------------
+
+@test_settings
+class AdminQueriesTests(TestCase):
+    """
+    Списки инцидентов и сообщений в админке и поля автодополнения:
+    число запросов не зависит от размера таблиц, страницы считает
+    EstimatedCountPaginator, полного COUNT(*) по большим таблицам нет.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", password=None)
+        cls.tech = User.objects.create_user("tech")
+        Group.objects.create(name=TECH_GROUP).user_set.add(cls.tech)
+        cls.service = Service.objects.create(name="Печать", price=100)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        start = User.objects.count()
+        services = Service.objects.bulk_create(
+            Service(name=f"Услуга {start + i}", price=100) for i in range(count)
+        )
+        users = User.objects.bulk_create(
+            User(username=f"user{start + i}") for i in range(count)
+        )
+        Incident.objects.bulk_create(
+            Incident(
+                service=services[i], created_by=users[i],
+                assigned_to=self.tech if i % 2 else None, comment=f"принтер {i}",
+            )
+            for i in range(count)
+        )
+        for i in range(count):
+            send_message(users[i], self.admin, f"сообщение {i}")
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, queries.captured_queries
+
+    def pages(self):
+        incidents = reverse("admin:service_desk_incident_changelist")
+        messages = reverse("admin:service_desk_message_changelist")
+        autocomplete = reverse("admin:autocomplete")
+        return [
+            (incidents, {}),
+            (incidents, {"status": "new"}),
+            (incidents, {"service__id__exact": self.service.pk}),
+            (incidents, {"assigned_to": self.tech.pk}),
+            (incidents, {"assigned_to": "none"}),
+            (incidents, {"q": "принтер"}),
+            (messages, {}),
+            (messages, {"q": "tech"}),
+            *(
+                (autocomplete, {"app_label": "service_desk", "model_name": model,
+                                "field_name": field, "term": "u"})
+                for model, field in (
+                    ("incident", "service"), ("incident", "created_by"),
+                    ("incident", "assigned_to"), ("message", "sender"),
+                )
+            ),
+        ]
+
+    def test_query_count_does_not_grow_with_table(self):
+        self.add_rows(3)
+        counts = {}
+        for url, params in self.pages():
+            counts[url, tuple(params.items())] = len(self.get(url, **params)[1])
+
+        # Больше страницы списка (100) и страницы автодополнения (20)
+        self.add_rows(150)
+        for url, params in self.pages():
+            with self.subTest(url=url, **params):
+                with self.assertNumQueries(counts[url, tuple(params.items())]):
+                    self.client.get(url, params)
+
+    def test_changelists_use_estimated_count(self):
+        tables = (Incident._meta.db_table, Message._meta.db_table)
+        self.add_rows(3)
+        for url, params in self.pages():
+            if "autocomplete" in url:
+                continue
+            with self.subTest(url=url, **params):
+                response, queries = self.get(url, **params)
+                self.assertIsInstance(response.context["cl"].paginator, EstimatedCountPaginator)
+                counts = [
+                    q["sql"] for q in queries
+                    if "COUNT(" in q["sql"] and any(f'"{t}"' in q["sql"] for t in tables)
+                ]
+                if not params:
+                    # Без фильтров — оценка по диапазону первичного ключа
+                    self.assertFalse(counts, counts)
+                # С фильтрами — COUNT не дальше ESTIMATED_COUNT_LIMIT строк
+                for sql in counts:
+                    self.assertIn(f"LIMIT {ESTIMATED_COUNT_LIMIT}", sql)
+
+
+# ----------------------------- РОЛИ -----------------------------
+
+@test_settings
+class RolesCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("bob")
+        cls.techs = Group.objects.create(name=TECH_GROUP)
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_roles(self):
+        return roles.get_roles(User.objects.get(pk=self.user.pk))
+
+    def assertInvalidatedOnCommit(self, change):
+        self.assertFalse(self.fresh_roles().is_tech)
+        with mock.patch.object(assignment_engine, "invalidate") as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+                # До коммита кеш не трогаем: его заново заполнили бы старыми группами
+                self.assertIsNotNone(cache.get(roles._cache_key(self.user.pk)))
+                invalidate.assert_not_called()
+            invalidate.assert_called_once_with()
+        self.assertTrue(self.fresh_roles().is_tech)
+
+    def test_user_groups_add(self):
+        self.assertInvalidatedOnCommit(lambda: self.user.groups.add(self.techs))
+
+    def test_group_user_set_add(self):
+        self.assertInvalidatedOnCommit(lambda: self.techs.user_set.add(self.user))
+
+    def test_group_renamed(self):
+        staff = Group.objects.create(name="Staff")
+        staff.user_set.add(self.user)
+
+        def rename():
+            staff.name = TECH_GROUP
+            self.techs.delete()
+            staff.save()
+
+        # Удаление и переименование — два сброса, каждый после коммита
+        self.assertFalse(self.fresh_roles().is_tech)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            rename()
+            self.assertFalse(self.fresh_roles().is_tech)
+        self.assertEqual(len(callbacks), 2)
+        self.assertTrue(self.fresh_roles().is_tech)
+
+
+# ----------------------------- АВТОНАЗНАЧЕНИЕ -----------------------------
+
+@test_settings
+@override_settings(AUTO_ASSIGN_INCIDENTS=True, ASSIGNMENT_REBUILD_INTERVAL=3600,
+                   THROTTLE_ENABLED=False)
+class AssignmentLoadsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        techs = Group.objects.create(name=TECH_GROUP)
+        cls.techs = [User.objects.create_user(f"tech{i}") for i in range(3)]
+        techs.user_set.add(*cls.techs)
+        cls.service = Service.objects.create(name="Услуга", price=100)
+
+    def setUp(self):
+        # Движок — на процесс: куча не должна пережить другой тест
+        assignment_engine.invalidate()
+        self.addCleanup(assignment_engine.invalidate)
+
+    def assertLoadsMatchDatabase(self):
+        tech_ids = [tech.pk for tech in self.techs]
+        self.assertEqual(assignment_engine.loads(), _open_loads(tech_ids))
+
+    def test_incremental_loads_match_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(9):
+                self.client.post(
+                    reverse("service_desk:create_incident_public"),
+                    {"service": self.service.pk, "comment": f"заявка {i}"},
+                )
+        loads = assignment_engine.loads()
+        self.assertEqual(sorted(loads.values()), [3, 3, 3])
+        self.assertLoadsMatchDatabase()
+
+        first, second = Incident.objects.order_by("id")[:2]
+        freed = {first.assigned_to_id, second.assigned_to_id}
+        with self.captureOnCommitCallbacks(execute=True):
+            first.status = "done"
+            first.save()
+            second.assigned_to = None
+            second.save()
+        self.assertLoadsMatchDatabase()
+
+        # Следующая заявка — одному из двух разгрузившихся техников
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("service_desk:create_incident_public"),
+                {"service": self.service.pk, "comment": "ещё одна"},
+            )
+        newest = Incident.objects.latest("id")
+        self.assertIn(newest.assigned_to_id, freed)
+        self.assertLoadsMatchDatabase()
+
+
+# ----------------------------- ВЫГРУЗКА -----------------------------
+
+# Строк в выгрузке; SERVICE_DESK_EXPORT_TEST_ROWS=1000000 — прогон на миллионе
+EXPORT_ROWS = int(os.environ.get("SERVICE_DESK_EXPORT_TEST_ROWS", 20_000))
+# Пик памяти не зависит от числа строк: порция EXPORT_CHUNK_SIZE и буфер ответа
+EXPORT_PEAK_LIMIT = 2 * 1024 * 1024
+
+@test_settings
+class ExportMemoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", password=None)
+        cls.service = Service.objects.create(name="Услуга", price=100)
+
+    def add_incidents(self, count):
+        Incident.objects.bulk_create(
+            (Incident(service=self.service, created_by=self.admin, comment="x" * 500)
+             for _ in range(count)),
+            batch_size=1000,
+        )
+
+    def export(self, fmt):
+        """(байт выгружено, пик памяти при выгрузке)."""
+        size = 0
+        tracemalloc.start()
+        try:
+            response = self.client.get(reverse("service_desk:incidents_export"), {"format": fmt})
+            for chunk in response.streaming_content:
+                size += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return size, peak
+
+    def test_peak_memory_is_bounded(self):
+        self.client.force_login(self.admin)
+        self.add_incidents(EXPORT_ROWS)
+        for fmt in export.EXPORT_FORMATS:
+            with self.subTest(fmt=fmt):
+                size, peak = self.export(fmt)
+                # Выгрузка — десятки мегабайт, в памяти — порция строк
+                self.assertGreater(size, EXPORT_ROWS * 500)
+                self.assertLess(peak, EXPORT_PEAK_LIMIT)
+
+    def test_command_applies_list_filters(self):
+        self.add_incidents(3)
+        printer = Incident.objects.create(
+            service=self.service, created_by=self.admin, comment="сломался принтер",
+        )
+        out = io.StringIO()
+        call_command("export_incidents", format="jsonl", q="принтер", stdout=out)
+        self.assertEqual([json.loads(line)["id"] for line in out.getvalue().splitlines()],
+                         [printer.pk])
+
+
+# ----------------------------- УВЕДОМЛЕНИЯ -----------------------------
+
+class FailingSender(BaseSender):
+    def send(self, notification):
+        raise ConnectionError("канал недоступен")
+
+
+@test_settings
+@override_settings(AUTO_ASSIGN_INCIDENTS=False, OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_BASE_DELAY=5)
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", password=None)
+        cls.tech = User.objects.create_user("tech")
+        cls.service = Service.objects.create(name="Печать", price=100)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "notifications.jsonl"
+        self.sender = FileSender(self.path)
+
+    def sent(self):
+        if not self.path.exists():
+            return []
+        return [json.loads(line) for line in self.path.read_text(encoding="utf-8").splitlines()]
+
+    def create_assigned(self):
+        return Incident.objects.create(
+            service=self.service, created_by=self.admin, assigned_to=self.tech,
+        )
+
+    def later(self, delta):
+        """timezone.now() для outbox, сдвинутый на delta вперёд."""
+        return mock.patch.object(
+            outbox.timezone, "now", return_value=timezone.now() + delta
+        )
+
+    def test_rollback_discards_message(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.create_assigned()
+            self.assertEqual(OutboxMessage.objects.count(), 1)
+            raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_changes_are_coalesced(self):
+        incident = self.create_assigned()
+        for status in ("in_progress", "done"):
+            incident.status = status
+            incident._event_actor_id = self.admin.pk
+            incident.save()
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+
+        self.assertEqual(outbox.deliver(outbox.claim(), self.sender), (1, 0))
+        [notification] = self.sent()
+        self.assertEqual(notification["recipient"], "tech")
+        self.assertEqual(notification["kinds"], [OutboxMessage.ASSIGNED, OutboxMessage.STATUS_CHANGED])
+        self.assertEqual(notification["status"], "done")
+        self.assertEqual(notification["actor"], "admin")
+        self.assertEqual(notification["events"], 3)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_claimed_rows_return_after_lease(self):
+        self.create_assigned()
+        [message] = outbox.claim()
+        # Воркер упал, не доставив: до конца аренды строку никто не заберёт
+        self.assertEqual(outbox.claim(), [])
+        with self.later(outbox.OUTBOX_LEASE + timedelta(seconds=1)):
+            [again] = outbox.claim()
+        self.assertEqual(again.pk, message.pk)
+        self.assertEqual(again.attempts, 2)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.create_assigned()
+        started = timezone.now()
+        self.assertEqual(outbox.deliver(outbox.claim(), FailingSender()), (0, 1))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.state, OutboxMessage.PENDING)
+        self.assertEqual(message.last_error, "ConnectionError: канал недоступен")
+        # Первая пауза — от половины до целой базы OUTBOX_RETRY_BASE_DELAY
+        self.assertGreaterEqual(message.available_at, started + timedelta(seconds=2.5))
+        self.assertLessEqual(message.available_at, timezone.now() + timedelta(seconds=5))
+        self.assertEqual(outbox.claim(), [])
+
+        with self.later(timedelta(seconds=6)):
+            self.assertEqual(outbox.deliver(outbox.claim(), self.sender), (1, 0))
+        self.assertEqual(len(self.sent()), 1)
+
+    def test_retry_delay_doubles_up_to_limit(self):
+        with mock.patch.object(outbox.random, "uniform", return_value=1.0):
+            self.assertEqual([outbox.retry_delay(n) for n in (1, 2, 3)], [5, 10, 20])
+            self.assertEqual(outbox.retry_delay(30), outbox.OUTBOX_MAX_RETRY_DELAY)
+
+    def test_exhausted_attempts_become_failed(self):
+        self.create_assigned()
+        for attempt in range(3):
+            with self.later(timedelta(hours=attempt)):
+                self.assertEqual(outbox.deliver(outbox.claim(), FailingSender()), (0, 1))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.state, message.attempts), (OutboxMessage.FAILED, 3))
+        with self.later(timedelta(days=1)):
+            self.assertEqual(outbox.claim(), [])
+
+    def test_sender_must_implement_send(self):
+        with self.assertRaises(TypeError):
+            BaseSender()
+
+
+# ----------------------------- МЕТРИКИ -----------------------------
+
+@test_settings
+class MetricsTests(TestCase):
+    def setUp(self):
+        # Счётчики — на процесс: без сброса в них запросы других тестов
+        metrics.store.reset()
+        self.addCleanup(metrics.store.reset)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write_snapshot(self, pid, requests):
+        stats = metrics._empty_view_stats()
+        stats["requests"] = requests
+        (self.directory / f"{pid}.json").write_text(json.dumps({"other": stats}))
+
+    def test_request_is_recorded(self):
+        self.client.get(reverse("service_desk:metrics"))
+        self.assertEqual(metrics.store.snapshot()["service_desk:metrics"]["requests"], 1)
+
+    def test_collect_drops_snapshots_of_dead_workers(self):
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        self.write_snapshot(os.getppid(), 2)
+        self.write_snapshot(dead.pid, 5)
+
+        with override_settings(METRICS_DIR=self.directory):
+            views = metrics.store.collect()
+
+        self.assertEqual(views["other"]["requests"], 2)
+        self.assertFalse((self.directory / f"{dead.pid}.json").exists())
+
+    def test_own_snapshot_removed_on_exit(self):
+        metrics.store.flush(self.directory)
+        path = self.directory / f"{os.getpid()}.json"
+        self.assertTrue(path.exists())
+        metrics.store.remove_snapshot()
+        self.assertFalse(path.exists())
+
+
+# ----------------------------- ОГРАНИЧЕНИЕ ЧАСТОТЫ -----------------------------
+
+class FakeClock:
+    """Подменяет модуль time в throttle.py: время двигает тест."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    monotonic = perf_counter = time
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@throttle.throttle("test")
+def throttled_view(request):
+    return HttpResponse("ok")
+
+
+@throttle.throttle("test", json=True)
+def throttled_api_view(request):
+    return HttpResponse("ok")
+
+
+@throttle.throttle("test", shed=True)
+def shed_view(request):
+    return HttpResponse("ok")
+
+
+@test_settings
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES={"test": (2, 10)},
+                   THROTTLE_SHED_LATENCY=0.25)
+class ThrottleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user("alice")
+        cls.bob = User.objects.create_user("bob")
+
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        patcher = mock.patch.object(throttle, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Оценка задержки — на процесс: у каждого теста своя, и по поддельным часам
+        latency = throttle.WriteLatency()
+        for module in (throttle, views):
+            patcher = mock.patch.object(module, "write_latency", latency)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def post(self, view, user=None, ip="10.0.0.1"):
+        request = self.factory.post("/", REMOTE_ADDR=ip)
+        request.user = user or AnonymousUser()
+        return view(request)
+
+    def test_empty_bucket_gets_429_with_retry_after(self):
+        self.assertEqual([self.post(throttled_view).status_code for _ in range(2)], [200, 200])
+        response = self.post(throttled_view)
+        self.assertEqual(response.status_code, 429)
+        # Токен — раз в 5 секунд
+        self.assertEqual(response["Retry-After"], "5")
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+
+    def test_api_scope_gets_json_429(self):
+        for _ in range(2):
+            self.post(throttled_api_view)
+        response = self.post(throttled_api_view)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "5")
+        self.assertEqual(
+            json.loads(response.content),
+            {"status": "error", "error": "Too many requests", "retry_after": 5},
+        )
+
+    @override_settings(THROTTLE_RATES={"chat_send": (1, 10)})
+    def test_chat_send_api_answers_json_429(self):
+        # Асинхронное представление: та же проверка в ветке async декоратора
+        self.client.force_login(self.alice)
+        url = reverse("service_desk:api_send_message")
+        data = {"receiver_id": self.bob.pk, "text": "привет"}
+        self.assertEqual(self.client.post(url, data).status_code, 200)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "10")
+        self.assertEqual(response.json()["retry_after"], 10)
+
+    def test_only_limited_methods_are_counted(self):
+        request = self.factory.get("/", REMOTE_ADDR="10.0.0.1")
+        request.user = AnonymousUser()
+        for _ in range(5):
+            self.assertEqual(throttled_view(request).status_code, 200)
+        self.assertEqual(self.post(throttled_view).status_code, 200)
+
+    def test_users_and_ips_have_separate_buckets(self):
+        for _ in range(2):
+            self.post(throttled_view, self.alice, ip="10.0.0.1")
+            self.post(throttled_view, ip="10.0.0.2")
+        self.assertEqual(self.post(throttled_view, self.alice, ip="10.0.0.1").status_code, 429)
+        self.assertEqual(self.post(throttled_view, ip="10.0.0.2").status_code, 429)
+
+        # Другой пользователь с того же IP и аноним с другого IP — свои ведра
+        self.assertEqual(self.post(throttled_view, self.bob, ip="10.0.0.1").status_code, 200)
+        self.assertEqual(self.post(throttled_view, ip="10.0.0.3").status_code, 200)
+        # Пользователь считается по себе, а не по IP
+        self.assertEqual(self.post(throttled_view, self.alice, ip="10.0.0.9").status_code, 429)
+
+    def test_bucket_refills_over_time(self):
+        for _ in range(2):
+            self.post(throttled_view)
+        self.assertEqual(self.post(throttled_view).status_code, 429)
+
+        self.clock.advance(4)
+        response = self.post(throttled_view)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+
+        self.clock.advance(1)
+        self.assertEqual(self.post(throttled_view).status_code, 200)
+        self.assertEqual(self.post(throttled_view).status_code, 429)
+
+        # Через полный период ведро снова полное, но не больше ёмкости
+        self.clock.advance(100)
+        statuses = [self.post(throttled_view).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_shedding_rejects_anonymous_until_latency_decays(self):
+        for _ in range(20):
+            throttle.write_latency.observe(2.0)
+
+        response = self.post(shed_view)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], str(throttle.SHED_RETRY_AFTER))
+        # Персонал проходит, области без shed не затронуты
+        self.assertEqual(self.post(shed_view, self.alice).status_code, 200)
+        self.assertEqual(self.post(throttled_view).status_code, 200)
+
+        # Без новых замеров оценка затухает: ~2 с → ~0,12 с за четыре полураспада
+        self.clock.advance(throttle.write_latency.half_life * 4)
+        self.assertLess(throttle.write_latency.current(), 0.25)
+        self.assertEqual(self.post(shed_view).status_code, 200)
+
+
+# ----------------------------- ЧАТ: СВОДКИ -----------------------------
+
+@test_settings
+class ConversationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user("alice")
+        cls.bob = User.objects.create_user("bob")
+
+    def summary(self):
+        return Conversation.objects.get()
+
+    def test_mark_read_cursor_stops_at_last_message(self):
+        first = send_message(self.alice, self.bob, "первое")
+        # Курсор из будущего — прочитано только то, что уже есть
+        self.assertEqual(mark_read(self.bob.pk, self.alice.pk, first.id + 1000), 0)
+        side = "low" if self.bob.pk < self.alice.pk else "high"
+        self.assertEqual(getattr(self.summary(), f"read_{side}_id"), first.id)
+
+        send_message(self.alice, self.bob, "второе")
+        self.assertEqual(getattr(self.summary(), f"unread_{side}"), 1)
+        self.assertEqual(mark_read(self.bob.pk, self.alice.pk), 0)
+
+    def test_seed_data_builds_conversations(self):
+        call_command(
+            "seed_data", services=1, techs=2, employees=4, incidents=0, messages=200,
+            stdout=io.StringIO(),
+        )
+        expected = {}
+        for sender_id, receiver_id, message_id in Message.objects.values_list(
+            "sender_id", "receiver_id", "id"
+        ):
+            pair = ordered_pair(sender_id, receiver_id)
+            expected[pair] = max(expected.get(pair, 0), message_id)
+        self.assertTrue(expected)
+        self.assertEqual(
+            {
+                (c.user_low_id, c.user_high_id): c.last_message_id
+                for c in Conversation.objects.all()
+            },
+            expected,
+        )
+
+
+# ----------------------------- ЧАТ: LONG-POLL -----------------------------
+
+# Одновременно ждущих вкладок: порядок реальной нагрузки, а не пара штук
+CHAT_SUBSCRIBERS = 300
+
+
+@test_settings
+class WaitMessagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user("alice")
+        cls.bob = User.objects.create_user("bob")
+
+    def wait_url(self):
+        return reverse("service_desk:api_wait_messages", args=[self.alice.pk])
+
+    async def test_concurrent_subscribers_receive_message(self):
+        # Сотни вкладок bob ждут переписку с alice, alice отправляет сообщение
+        tab = self.async_client_class()
+        await tab.aforce_login(self.bob)
+        waits = [
+            asyncio.create_task(tab.get(self.wait_url(), {"since_id": 0}))
+            for _ in range(CHAT_SUBSCRIBERS)
+        ]
+        await _wait_for_subscribers(CHAT_SUBSCRIBERS, timeout=30)
+
+        sender = self.async_client_class()
+        await sender.aforce_login(self.alice)
+        response = await sender.post(
+            reverse("service_desk:api_send_message"),
+            {"receiver_id": self.bob.pk, "text": "привет"},
+        )
+        self.assertEqual(response.json()["status"], "ok")
+
+        responses = await asyncio.wait_for(asyncio.gather(*waits), 30)
+        self.assertEqual(len(responses), CHAT_SUBSCRIBERS)
+        for response in responses:
+            data = response.json()
+            self.assertTrue(data["push"])
+            self.assertEqual([m["text"] for m in data["messages"]], ["привет"])
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    async def test_publish_during_db_check_is_not_lost(self):
+        # Сообщение приходит, пока идёт запрос к БД: ответ не должен ждать таймаута
+        original = views._amessages_page
+        calls = 0
+
+        async def racing_page(user, other, **kwargs):
+            nonlocal calls
+            calls += 1
+            data = await original(user, other, **kwargs)
+            if calls == 1:
+                await sync_to_async(send_message)(self.alice, self.bob, "гонка")
+                broker.publish(self.alice.pk, self.bob.pk)
+                # Запрос к БД длится несколько итераций loop: event.set успевает выполниться
+                await asyncio.sleep(0)
+            return data
+
+        await self.async_client.aforce_login(self.bob)
+        with mock.patch.object(views, "_amessages_page", racing_page), \
+                mock.patch.object(views, "CHAT_WAIT_TIMEOUT", 10):
+            response = await asyncio.wait_for(
+                self.async_client.get(self.wait_url(), {"since_id": 0}), 2
+            )
+
+        self.assertEqual([m["text"] for m in response.json()["messages"]], ["гонка"])
+        self.assertEqual(calls, 2)
+
+
+# ----------------------------- ЧАТ: АРХИВ -----------------------------
+
+@test_settings
+class ArchivedHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user("alice")
+        cls.bob = User.objects.create_user("bob")
+        carol = User.objects.create_user("carol")
+        # Переписки чередуются: сегменты пачки принадлежат разным парам
+        for i in range(130):
+            send_message(*((cls.alice, cls.bob) if i % 2 else (cls.bob, cls.alice)), f"сообщение {i}")
+            if i % 5 == 0:
+                send_message(cls.alice, carol, f"другая переписка {i}")
+        # Старше срока хранения — первые 75 сообщений пары
+        old = views._conversation(cls.alice, cls.bob).order_by("id")[74].id
+        Message.objects.filter(id__lte=old).update(created_at=timezone.now() - timedelta(days=200))
+
+    def history(self):
+        """Вся история alice ↔ bob глазами bob: страницы от новых к старым."""
+        url = reverse("service_desk:api_get_messages", args=[self.alice.pk])
+        pages, params = [], {}
+        while True:
+            data = self.client.get(url, params).json()
+            pages.append(data["messages"])
+            if not data["has_more"]:
+                return pages
+            params = {"before_id": data["messages"][0]["id"]}
+
+    def test_paging_is_identical_after_archiving(self):
+        self.client.force_login(self.bob)
+        before = self.history()
+
+        call_command("archive_messages", days=180, batch_size=20, stdout=io.StringIO())
+        self.assertTrue(MessageArchiveSegment.objects.filter(user_low=self.alice).exists())
+        self.assertEqual(views._conversation(self.alice, self.bob).count(), 130 - 75)
+
+        after = self.history()
+        self.assertEqual(after, before)
+        # 130 сообщений: горячая страница, страница через границу архива, архивная
+        self.assertEqual([len(page) for page in after], [50, 50, 30])
@@ -0,0 +1,177 @@
+# service_desk/throttle.py
+
+"""
+Ограничение частоты запросов и сброс нагрузки.
+
+Token bucket: у каждого клиента (пользователь, для анонимов — IP) в каждой
+области (scope) своё ведро на N токенов, которое наполняется со скоростью
+N токенов за период из THROTTLE_RATES; запрос тратит один токен. Ведра
+лежат в кеше Django, общем для воркеров (CACHES, service_desk/cache.py).
+Чтение-изменение-запись ведра между воркерами не атомарно: в гонке
+проскочит лишний запрос, для защиты от флуда это допустимо.
+
+Сброс нагрузки: время записей в БД сглаживается (EWMA). Пока оценка выше
+THROTTLE_SHED_LATENCY, анонимные запросы областей с shed=True сразу
+получают 429, не доходя до БД, — запись остаётся персоналу. Оценка
+затухает со временем, поэтому сброс прекращается сам, даже когда записей
+нет.
+"""
+
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+# Через сколько секунд повторить запрос, отклонённый сбросом нагрузки
+SHED_RETRY_AFTER = 5
+
+
+class TokenBucket:
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """0, если токен взят; иначе — сколько секунд ждать следующего."""
+        now = time.time()
+        with self._lock:
+            tokens, updated = cache.get(key) or (self.capacity, now)
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Ведро хранится и после отказа: иначе время обновления потеряется
+            # и пустое ведро снова окажется полным. Ключ живёт период —
+            # за это время ведро наполняется целиком
+            cache.set(key, (tokens, now), math.ceil(self.period))
+        return 0 if allowed else (1 - tokens) / self.rate
+
+
+class WriteLatency:
+    """Сглаженное время записи в БД, затухающее без новых замеров."""
+
+    def __init__(self, alpha=0.2, half_life=5.0):
+        self.alpha = alpha
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._at = time.monotonic()
+
+    def _decayed(self, now):
+        return self._value * 0.5 ** ((now - self._at) / self.half_life)
+
+    def observe(self, seconds):
+        now = time.monotonic()
+        with self._lock:
+            self._value = self._decayed(now) * (1 - self.alpha) + seconds * self.alpha
+            self._at = now
+
+    def reset(self):
+        with self._lock:
+            self._value = 0.0
+            self._at = time.monotonic()
+
+    def current(self):
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+    @contextmanager
+    def track(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+write_latency = WriteLatency()
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _bucket(scope):
+    capacity, period = settings.THROTTLE_RATES[scope]
+    with _buckets_lock:
+        bucket = _buckets.get(scope)
+        if bucket is None or (bucket.capacity, bucket.period) != (capacity, period):
+            bucket = _buckets[scope] = TokenBucket(capacity, period)
+    return bucket
+
+
+def client_key(request):
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    ip = request.META.get("REMOTE_ADDR", "")
+    if getattr(settings, "THROTTLE_TRUST_X_FORWARDED_FOR", False):
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+        if forwarded:
+            ip = forwarded.split(",")[0].strip()
+    return f"ip:{ip}"
+
+
+def check(request, scope, shed=False):
+    """Секунды до повтора, если запрос нужно отклонить, иначе None."""
+    if not getattr(settings, "THROTTLE_ENABLED", True):
+        return None
+
+    if shed and not request.user.is_authenticated:
+        threshold = getattr(settings, "THROTTLE_SHED_LATENCY", None)
+        if threshold is not None and write_latency.current() > threshold:
+            return SHED_RETRY_AFTER
+
+    wait = _bucket(scope).take(f"throttle:{scope}:{client_key(request)}")
+    return wait or None
+
+
+def too_many_requests(retry_after, json=False):
+    seconds = max(math.ceil(retry_after), 1)
+    if json:
+        response = JsonResponse(
+            {"status": "error", "error": "Too many requests", "retry_after": seconds},
+            status=429,
+        )
+    else:
+        response = HttpResponse(
+            f"Слишком много запросов. Повторите через {seconds} с.",
+            status=429, content_type="text/plain; charset=utf-8",
+        )
+    response.headers["Retry-After"] = str(seconds)
+    return response
+
+
+def throttle(scope, shed=False, json=False, methods=("POST",)):
+    """
+    Декоратор представления: ограничивает запросы methods по области scope.
+    shed — отклонять анонимные запросы при перегрузке записи;
+    json — отвечать 429 в формате API.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method in methods:
+                    retry_after = await sync_to_async(check)(request, scope, shed)
+                    if retry_after is not None:
+                        return too_many_requests(retry_after, json)
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                retry_after = check(request, scope, shed)
+                if retry_after is not None:
+                    return too_many_requests(retry_after, json)
+            return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -16,6 +16,8 @@ urlpatterns = [
     # ITSM панель
     path('itsm/', views.itsm_dashboard, name='itsm_dashboard'),
     path('itsm/incidents/', views.incidents_list, name='incidents_list'),
+    path('itsm/incidents/export/', views.incidents_export, name='incidents_export'),
+    path('itsm/incidents/bulk/', views.incidents_bulk, name='incidents_bulk'),
     path('itsm/incidents/<int:pk>/', views.incident_detail, name='incident_detail'),
 
     # Услуги (только staff/admin)
@@ -30,4 +32,14 @@ urlpatterns = [
     # API
     path('api/chat/send/', views.api_send_message, name='api_send_message'),
     path('api/chat/get/<int:user_id>/', views.api_get_messages, name='api_get_messages'),
+    path('api/chat/wait/<int:user_id>/', views.api_wait_messages, name='api_wait_messages'),
+    path('api/chat/read/<int:user_id>/', views.api_mark_read, name='api_mark_read'),
+
+    # JSON API инцидентов (только чтение)
+    path('api/incidents/', views.api_incidents, name='api_incidents'),
+    path('api/incidents/<int:pk>/', views.api_incident, name='api_incident'),
+    path('api/incidents/changes/', views.api_incident_changes, name='api_incident_changes'),
+
+    # Метрики (staff)
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
@@ -1,20 +1,47 @@
 # service_desk/views.py
 
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponseForbidden, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
 from django.contrib.auth.models import User
-
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.urls import reverse
+from django.views.decorators.http import condition, require_POST, require_safe
+
+from . import api, events, fragments, metrics
+from .archive import read_archive
+from .assignment import assign_new_incident, auto_assign_enabled
+from .bulk import update_matching, update_selected
+from .catalog import catalog_etag, catalog_html, catalog_last_modified
+from .conversations import mark_read, recent_conversations, send_message
 from .models import Service, Incident, Message
-from .forms import PublicIncidentForm, ServiceForm
+from .db import retry_on_lock
+from .export import EXPORT_FORMATS, iter_export
+from .forms import BulkActionForm, IncidentFilterForm, PublicIncidentForm, ServiceForm
+from .pagination import paginate_keyset
+from .pubsub import broker
+from .roles import TECH_GROUP, get_roles
+from .search import attach_snippets, filter_matching, search_incidents
+from .stats import dashboard_stats
+from .throttle import throttle, write_latency
 
 # --------------------------- ПУБЛИКА -----------------------------
 
+@condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
 def index(request):
-    services = Service.objects.filter(is_active=True)
-    return render(request, 'index.html', {'services': services})
+    return render(request, 'index.html', {'catalog': catalog_html()})
 
 
+@throttle("incident_submit", shed=True)
 def create_incident_public(request):
     if request.method == 'POST':
         form = PublicIncidentForm(request.POST)
@@ -23,7 +50,10 @@ def create_incident_public(request):
             incident.status = 'new'
             if request.user.is_authenticated:
                 incident.created_by = request.user
-            incident.save()
+            if auto_assign_enabled():
+                assign_new_incident(incident)
+            with write_latency.track():
+                retry_on_lock(incident.save)()
             return render(request, 'request_success.html', {'incident': incident})
     else:
         form = PublicIncidentForm()
@@ -42,11 +72,7 @@ def itsm_access(user):
 
 def services_edit_access(user):
     """Разрешено сотрудникам и админам."""
-    return (
-        user.is_superuser
-        or user.is_staff
-        or not user.groups.filter(name="Tech").exists()
-    )
+    return get_roles(user).can_edit_services
 
 
 # --------------------------- ITSM -------------------------------
@@ -54,71 +80,195 @@ def services_edit_access(user):
 @login_required
 @user_passes_test(itsm_access)
 def itsm_dashboard(request):
-    is_tech = request.user.groups.filter(name="Tech").exists()
-    is_admin = request.user.is_superuser or request.user.is_staff
+    roles = request.roles
     return render(request, 'itsm/dashboard.html', {
-        "is_tech": is_tech,
-        "is_admin": is_admin
+        "is_tech": roles.is_tech,
+        "is_admin": roles.is_admin,
+        "stats": dashboard_stats() if roles.can_view_incidents else None,
     })
 
 
+INCIDENTS_PAGE_SIZE = 50
+
+
 @login_required
 @user_passes_test(itsm_access)
 def incidents_list(request):
-    user = request.user
-
     # Админ и техник → видят все
-    if user.is_superuser or user.is_staff or user.groups.filter(name='Tech').exists():
-        incidents = Incident.objects.all()
+    if not request.roles.can_view_incidents:
+        return HttpResponseForbidden("Нет доступа.")
+
+    filter_form = IncidentFilterForm(request.GET)
+    incidents = filter_form.filter(
+        Incident.objects.select_related('service', 'assigned_to')
+    )
+    search_text = filter_form.search_text
+
+    if search_text:
+        # Поиск: по релевантности, страницы по смещению
+        offset = max(_int_param(request, 'offset') or 0, 0)
+        rows = list(
+            search_incidents(incidents, search_text)[offset:offset + INCIDENTS_PAGE_SIZE + 1]
+        )
+        attach_snippets(rows[:INCIDENTS_PAGE_SIZE], search_text)
+        page = {
+            'items': rows[:INCIDENTS_PAGE_SIZE],
+            'next_offset': offset + INCIDENTS_PAGE_SIZE if len(rows) > INCIDENTS_PAGE_SIZE else None,
+            'prev_offset': max(offset - INCIDENTS_PAGE_SIZE, 0) if offset else None,
+        }
+        incidents = page['items']
     else:
+        page = paginate_keyset(
+            incidents,
+            INCIDENTS_PAGE_SIZE,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+        incidents = page
+
+    return render(request, 'itsm/incidents_list.html', {
+        'rows': fragments.incident_rows(incidents, search_text),
+        'page': page,
+        'search_text': search_text,
+        'filter_form': filter_form,
+        'bulk_form': BulkActionForm(),
+        'can_assign': request.roles.can_assign,
+        # С этого события страница подтягивает изменения (api_incident_changes)
+        'events_cursor': events.latest_cursor(),
+    })
+
+
+@login_required
+@user_passes_test(itsm_access)
+def incidents_export(request):
+    """Выгрузка инцидентов с фильтрами списка: ?format=csv|jsonl."""
+    if not request.roles.can_view_incidents:
         return HttpResponseForbidden("Нет доступа.")
 
-    incidents = incidents.order_by('-created_at')
-    return render(request, 'itsm/incidents_list.html', {'incidents': incidents})
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+
+    filter_form = IncidentFilterForm(request.GET)
+    incidents = filter_form.filter(Incident.objects.all())
+    if filter_form.search_text:
+        incidents = filter_matching(incidents, filter_form.search_text)
+
+    response = StreamingHttpResponse(
+        iter_export(incidents, fmt),
+        content_type='text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson',
+    )
+    response['Content-Disposition'] = f'attachment; filename="incidents.{fmt}"'
+    return response
+
+
+@login_required
+@user_passes_test(itsm_access)
+@require_POST
+def incidents_bulk(request):
+    """
+    Массовая смена статуса/исполнителя из списка инцидентов.
+    GET-параметры — фильтры списка (для scope=filter и возврата назад).
+    """
+    if not request.roles.can_view_incidents:
+        return HttpResponseForbidden("Нет доступа.")
+
+    back = reverse('service_desk:incidents_list')
+    if request.GET:
+        back += '?' + request.GET.urlencode()
+
+    form = BulkActionForm(request.POST)
+    if not form.is_valid():
+        for error in form.non_field_errors() or ["Некорректное действие."]:
+            messages.error(request, error)
+        return redirect(back)
+
+    field, value = form.cleaned_data['change']
+    if field == 'assigned_to_id' and not request.roles.can_assign:
+        return HttpResponseForbidden("Нет доступа.")
+
+    if form.cleaned_data['scope'] == 'filter':
+        filter_form = IncidentFilterForm(request.GET)
+        incidents = filter_form.filter(Incident.objects.all())
+        if filter_form.search_text:
+            incidents = filter_matching(incidents, filter_form.search_text)
+        result = update_matching(incidents, field, value, actor=request.user)
+    else:
+        result = update_selected(
+            form.cleaned_data['expected_versions'], field, value, actor=request.user
+        )
+
+    messages.success(
+        request,
+        f"Изменено: {result.updated}, уже в нужном состоянии: {result.unchanged}.",
+    )
+    if result.conflicts:
+        ids = ", ".join(f"#{pk}" for pk in result.conflicts[:20])
+        if len(result.conflicts) > 20:
+            ids += " …"
+        messages.warning(
+            request,
+            f"Не изменены — их уже изменил другой пользователь или они удалены: {ids}",
+        )
+    return redirect(back)
 
 
 @login_required
 @user_passes_test(itsm_access)
 def incident_detail(request, pk):
-    incident = get_object_or_404(Incident, pk=pk)
-    user = request.user
+    incident = get_object_or_404(
+        Incident.objects.select_related('service', 'assigned_to'), pk=pk
+    )
 
     # Может ли менять статус?
-    can_edit_status = (
-        user.is_superuser
-        or user.is_staff
-        or user.groups.filter(name='Tech').exists()
-    )
+    can_edit_status = request.roles.can_view_incidents
 
     if request.method == "POST":
         action = request.POST.get("action")
+        change = None
 
         if action == "status" and can_edit_status:
             new_status = request.POST.get("status")
             if new_status in dict(Incident.STATUS_CHOICES):
-                incident.status = new_status
-                incident.save()
+                change = ("status", new_status)
 
-        if action == "assign" and (user.is_superuser or user.is_staff):
+        if action == "assign" and request.roles.can_assign:
             tech_id = request.POST.get("assigned_to")
-            if tech_id:
-                tech = User.objects.filter(id=tech_id).first()
-                incident.assigned_to = tech
-            else:
-                incident.assigned_to = None
-            incident.save()
+            tech = User.objects.filter(id=tech_id).first() if tech_id else None
+            change = ("assigned_to_id", tech.id if tech else None)
+
+        if change:
+            # Версия, с которой пользователь открыл страницу
+            try:
+                version = int(request.POST["version"])
+            except (KeyError, ValueError):
+                version = incident.version
+            result = update_selected({incident.pk: version}, *change, actor=request.user)
+            if result.conflicts:
+                messages.error(
+                    request,
+                    "Инцидент уже изменил другой пользователь — "
+                    "проверьте актуальные данные и повторите.",
+                )
 
         return redirect("service_desk:incident_detail", pk=incident.pk)
 
-    techs = None
-    if user.is_superuser or user.is_staff:
-        techs = User.objects.filter(groups__name="Tech")
+    tech_select = None
+    if request.roles.can_assign:
+        techs = list(
+            User.objects.filter(groups__name=TECH_GROUP)
+            .order_by('id').values_list('id', 'username')
+        )
+        if techs:
+            tech_select = fragments.tech_select(techs, incident.assigned_to_id)
 
     return render(request, 'itsm/incident_detail.html', {
         'incident': incident,
+        'incident_card': fragments.incident_card(incident),
         'can_edit': can_edit_status,
         'status_choices': Incident.STATUS_CHOICES,
-        'techs': techs,
+        'tech_select': tech_select,
+        'history': events.history(incident.pk),
     })
 
 
@@ -132,11 +282,7 @@ def services_list(request):
     services = Service.objects.all()
 
     # employee и admin могут создавать услуги → передаем флаг в шаблон
-    can_edit = (
-        request.user.is_superuser
-        or request.user.is_staff
-        or not request.user.groups.filter(name="Tech").exists()
-    )
+    can_edit = request.roles.can_edit_services
 
     return render(request, 'itsm/services_list.html', {
         'services': services,
@@ -147,7 +293,7 @@ def services_list(request):
 @login_required
 def service_create(request):
     """Создавать услугу могут admin / staff / employee, но НЕ Tech."""
-    if request.user.groups.filter(name="Tech").exists():
+    if request.roles.is_tech:
         return HttpResponseForbidden("Нет прав на создание услуг.")
 
     if request.method == 'POST':
@@ -167,7 +313,7 @@ def service_create(request):
 @login_required
 def service_edit(request, pk):
     """Редактировать услугу могут admin / staff / employee, но НЕ Tech."""
-    if request.user.groups.filter(name="Tech").exists():
+    if request.roles.is_tech:
         return HttpResponseForbidden("Нет прав на редактирование услуг.")
 
     service = get_object_or_404(Service, pk=pk)
@@ -189,7 +335,7 @@ def service_edit(request, pk):
 @login_required
 def service_delete(request, pk):
     """Удалять услугу могут admin / staff / employee, но НЕ Tech."""
-    if request.user.groups.filter(name="Tech").exists():
+    if request.roles.is_tech:
         return HttpResponseForbidden("Нет прав на удаление услуг.")
 
     service = get_object_or_404(Service, pk=pk)
@@ -205,10 +351,29 @@ def service_delete(request, pk):
 
 # ----------------------------- ЧАТ -------------------------------
 
+CHAT_LIST_PAGE_SIZE = 30
+
+
 @login_required
 def chat_list(request):
-    users = User.objects.exclude(id=request.user.id)
-    return render(request, "chat/chat_list.html", {"users": users})
+    """Недавние переписки с непрочитанными + постраничный список сотрудников."""
+    conversations, conversations_next = recent_conversations(
+        request.user.id, CHAT_LIST_PAGE_SIZE, before=_int_param(request, "before")
+    )
+
+    users = User.objects.exclude(id=request.user.id).only("id", "username").order_by("id")
+    users_after = _int_param(request, "users_after")
+    if users_after is not None:
+        users = users.filter(id__gt=users_after)
+    users = list(users[:CHAT_LIST_PAGE_SIZE + 1])
+    users_next = users[CHAT_LIST_PAGE_SIZE - 1].id if len(users) > CHAT_LIST_PAGE_SIZE else None
+
+    return render(request, "chat/chat_list.html", {
+        "conversations": conversations,
+        "conversations_next": conversations_next,
+        "users": users[:CHAT_LIST_PAGE_SIZE],
+        "users_next": users_next,
+    })
 
 
 @login_required
@@ -217,45 +382,317 @@ def chat_room(request, user_id):
     return render(request, "chat/chat_room.html", {"other": other})
 
 
+# Сколько сообщений отдаём за один запрос истории
+CHAT_PAGE_SIZE = 50
+
+
+def _conversation(user, other):
+    """Все сообщения между двумя пользователями."""
+    return Message.objects.filter(
+        Q(sender=user, receiver=other) | Q(sender=other, receiver=user)
+    )
+
+
+def _serialize_message(m, user, other):
+    # Отправитель всегда один из двух участников — без лишних запросов к User
+    is_me = m.sender_id == user.id
+    return {
+        "id": m.id,
+        "sender": user.username if is_me else other.username,
+        "text": m.text,
+        "created_at": timezone.localtime(m.created_at).strftime("%H:%M"),
+        "is_me": is_me,
+    }
+
+
+def _int_param(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def _page_query(user, other, since_id=None, before_id=None):
+    messages = _conversation(user, other).only(
+        "id", "sender_id", "text", "created_at"
+    )
+    if since_id is not None:
+        return messages.filter(id__gt=since_id).order_by("id")[:CHAT_PAGE_SIZE]
+    if before_id is not None:
+        messages = messages.filter(id__lt=before_id)
+    return messages.order_by("-id")[:CHAT_PAGE_SIZE + 1]
+
+
+def _needs_archive(page, since_id):
+    """Горячая история кончилась — страницу дочитываем из архива."""
+    return since_id is None and len(page) <= CHAT_PAGE_SIZE
+
+
+def _archive_args(user, other, page, before_id):
+    return dict(
+        user_id=user.id, other_id=other.id,
+        before_id=page[-1].id if page else before_id,
+        limit=CHAT_PAGE_SIZE + 1 - len(page),
+    )
+
+
+def _page_data(page, user, other, since_id=None):
+    if since_id is not None:
+        has_more = len(page) == CHAT_PAGE_SIZE
+    else:
+        has_more = len(page) > CHAT_PAGE_SIZE
+        page = page[:CHAT_PAGE_SIZE]
+        page.reverse()
+
+    return {
+        "messages": [_serialize_message(m, user, other) for m in page],
+        "latest_id": page[-1].id if page else since_id,
+        "has_more": has_more,
+    }
+
+
+def _messages_page(user, other, since_id=None, before_id=None):
+    """Страница истории на синхронном ORM (для синхронного кода)."""
+    page = list(_page_query(user, other, since_id, before_id))
+    if _needs_archive(page, since_id):
+        page += read_archive(**_archive_args(user, other, page, before_id))
+    return _page_data(page, user, other, since_id)
+
+
+async def _amessages_page(user, other, since_id=None, before_id=None):
+    """Страница истории на асинхронном ORM."""
+    page = [m async for m in _page_query(user, other, since_id, before_id)]
+    if _needs_archive(page, since_id):
+        page += await sync_to_async(read_archive)(**_archive_args(user, other, page, before_id))
+    return _page_data(page, user, other, since_id)
+
+
+async def _other_user(user_id):
+    other = await User.objects.filter(id=user_id).afirst()
+    if other is None:
+        raise Http404
+    return other
+
+
 @login_required
-def api_get_messages(request, user_id):
-    other = get_object_or_404(User, id=user_id)
+async def api_get_messages(request, user_id):
+    """
+    История переписки с курсором:
+      ?since_id=N  — только новые сообщения (id > N), для опроса;
+      ?before_id=N — предыдущая страница (id < N), для прокрутки вверх;
+      без параметров — последние CHAT_PAGE_SIZE сообщений.
+    latest_id — курсор для следующего опроса, has_more — есть ещё
+    сообщения в запрошенном направлении.
+
+    Асинхронное представление: под ASGI опрос не занимает поток
+    на всё время обработки, только на SQL-запросы.
+    """
+    user = await request.auser()
+    other = await _other_user(user_id)
+    return JsonResponse(await _amessages_page(
+        user, other,
+        since_id=_int_param(request, "since_id"),
+        before_id=_int_param(request, "before_id"),
+    ))
+
+
+# Сколько держим long-poll запрос открытым, если новых сообщений нет
+CHAT_WAIT_TIMEOUT = 25
 
-    messages = Message.objects.filter(
-        sender__in=[request.user, other],
-        receiver__in=[request.user, other]
-    ).order_by("created_at")
 
-    return JsonResponse({
-        "messages": [
-            {
-                "id": m.id,
-                "sender": m.sender.username,
-                "text": m.text,
-                "created_at": m.created_at.strftime("%H:%M"),
-                "is_me": m.sender == request.user
-            }
-            for m in messages
-        ]
-    })
+@login_required
+async def api_wait_messages(request, user_id):
+    """
+    Long-poll: ждёт сообщений после ?since_id=N и отвечает сразу, как
+    только они появятся (или по таймауту с пустым списком).
+
+    Под WSGI ожидание заняло бы целый поток, поэтому там отвечаем
+    сразу с "push": false — клиент переходит на обычный опрос.
+    """
+    user = await request.auser()
+    other = await _other_user(user_id)
+
+    since_id = _int_param(request, "since_id")
+    push = isinstance(request, ASGIRequest)
+
+    if not push or since_id is None:
+        data = await _amessages_page(user, other, since_id=since_id)
+        data["push"] = push
+        return JsonResponse(data)
+
+    # Подписываемся до проверки БД, чтобы не пропустить публикацию между ними
+    async with broker.subscribe(user.id, other.id) as event:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CHAT_WAIT_TIMEOUT
+
+        while True:
+            # Сброс до запроса к БД: публикация во время запроса оставит
+            # событие взведённым, и wait() вернётся сразу
+            event.clear()
+            data = await _amessages_page(user, other, since_id=since_id)
+            remaining = deadline - loop.time()
+            if data["messages"] or remaining <= 0:
+                break
+
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    data["push"] = True
+    return JsonResponse(data)
 
 
 @login_required
-def api_send_message(request):
+@throttle("chat_send", json=True)
+async def api_send_message(request):
     if request.method != "POST":
         return JsonResponse({"status": "error", "error": "POST required"}, status=405)
 
     receiver_id = request.POST.get("receiver_id")
-    text = request.POST.get("text")
+    text = (request.POST.get("text") or "").strip()
+    if not text:
+        return JsonResponse({"status": "error", "error": "Empty message"}, status=400)
 
-    receiver = User.objects.filter(id=receiver_id).first()
+    user = await request.auser()
+    receiver = await User.objects.filter(id=receiver_id).afirst()
     if not receiver:
         return JsonResponse({"status": "error", "error": "Receiver not found"}, status=404)
 
-    Message.objects.create(
-        sender=request.user,
-        receiver=receiver,
-        text=text
+    # Асинхронный ORM не умеет транзакции — запись с повторами идёт в потоке
+    with write_latency.track():
+        message = await sync_to_async(send_message)(user, receiver, text)
+    broker.publish(user.id, receiver.id)
+
+    return JsonResponse({"status": "ok", "id": message.id})
+
+
+@login_required
+def api_mark_read(request, user_id):
+    """Отмечает переписку прочитанной до ?last_id (по умолчанию — целиком)."""
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "error": "POST required"}, status=405)
+
+    try:
+        last_id = int(request.POST["last_id"])
+    except (KeyError, ValueError):
+        last_id = None
+
+    unread = mark_read(request.user.id, user_id, last_id)
+    return JsonResponse({"status": "ok", "unread": unread})
+
+
+# ------------------------- API ИНЦИДЕНТОВ ---------------------------
+
+def _api_error(message, status):
+    return JsonResponse({"status": "error", "error": message}, status=status)
+
+
+def _with_etag(request, etag, build):
+    """304 для совпавшего If-None-Match, иначе ответ build(); ETag — в обоих."""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+    response.headers["ETag"] = etag
+    # Клиент может хранить ответ, но обязан сверить ETag перед использованием
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def _page_url(request, **params):
+    query = request.GET.copy()
+    for name, value in params.items():
+        query.pop(name, None)
+        if value is not None:
+            query[name] = value
+    return request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+
+
+@login_required
+@require_safe
+def api_incidents(request):
+    """
+    Список инцидентов: ?fields=, фильтры списка (status, service,
+    assigned_to, q), ?limit= и курсоры ?after=/?before= из next/previous.
+    """
+    if not request.roles.can_view_incidents:
+        return _api_error("Нет доступа", 403)
+    try:
+        fields = api.parse_fields(request.GET.get("fields"))
+    except ValueError as exc:
+        return _api_error(str(exc), 400)
+
+    limit = min(max(_int_param(request, "limit") or api.API_PAGE_SIZE, 1), api.API_MAX_PAGE_SIZE)
+
+    filter_form = IncidentFilterForm(request.GET)
+    incidents = filter_form.filter(Incident.objects.all())
+    if filter_form.search_text:
+        incidents = filter_matching(incidents, filter_form.search_text)
+
+    page = paginate_keyset(
+        api.select(incidents, fields), limit,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
     )
 
-    return JsonResponse({"status": "ok"})
+    return _with_etag(request, api.page_etag(page.items, fields), lambda: JsonResponse({
+        "results": [api.serialize(row, fields) for row in page],
+        "next": page.next_cursor and _page_url(request, after=page.next_cursor, before=None),
+        "previous": page.prev_cursor and _page_url(request, before=page.prev_cursor, after=None),
+    }))
+
+
+@login_required
+@require_safe
+def api_incident(request, pk):
+    """Один инцидент: ?fields=; ETag по версии строки."""
+    if not request.roles.can_view_incidents:
+        return _api_error("Нет доступа", 403)
+    try:
+        fields = api.parse_fields(request.GET.get("fields"))
+    except ValueError as exc:
+        return _api_error(str(exc), 400)
+
+    row = api.select(Incident.objects.filter(pk=pk), fields).first()
+    if row is None:
+        return _api_error("Инцидент не найден", 404)
+
+    return _with_etag(
+        request, api.resource_etag(row, fields),
+        lambda: JsonResponse(api.serialize(row, fields)),
+    )
+
+
+@login_required
+@require_safe
+def api_incident_changes(request):
+    """
+    Лента изменений: события после ?since=<id события> (по возрастанию),
+    не больше ?limit=. Без since — пустой список и текущий курсор.
+    """
+    if not request.roles.can_view_incidents:
+        return _api_error("Нет доступа", 403)
+
+    since = _int_param(request, "since")
+    if since is None:
+        return JsonResponse({"events": [], "cursor": events.latest_cursor(), "has_more": False})
+
+    limit = min(max(_int_param(request, "limit") or events.FEED_PAGE_SIZE, 1), events.FEED_MAX_PAGE_SIZE)
+    page, has_more = events.changes_since(since, limit)
+    return JsonResponse({
+        "events": [events.serialize(event) for event in page],
+        "cursor": page[-1].id if page else since,
+        "has_more": has_more,
+    })
+
+
+# ---------------------------- МЕТРИКИ -----------------------------
+
+@login_required
+@user_passes_test(lambda user: user.is_staff)
+def metrics_view(request):
+    """Метрики запросов в текстовом формате Prometheus (только staff)."""
+    return HttpResponse(
+        metrics.render_prometheus(metrics.store.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )